@@ -0,0 +1 @@
+cd src && python3 -m bench "$@"
\ No newline at end of file
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+
+from manifest import hash_file, load_manifest, save_manifest
+from output import remove_output
+
+LARGE_FILE = 1024 * 1024
+
+
+def scan_files(directory, prefix=""):
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if entry.is_dir():
+                files.update(scan_files(entry.path, rel_path + "/"))
+            elif entry.is_file():
+                stat = entry.stat()
+                files[rel_path] = (entry.path, stat)
+    return files
+
+
+def _kernel_copy(src, dst, size):
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+            return offset
+        except OSError:
+            pass
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                copied = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+            return offset
+        except OSError:
+            pass
+    src.seek(offset)
+    dst.seek(offset)
+    shutil.copyfileobj(src, dst, 1024 * 1024)
+    return size
+
+
+def copy_file(source, dest, stat):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), prefix="." + os.path.basename(dest), suffix=".tmp")
+    try:
+        with open(source, "rb") as src, os.fdopen(fd, "wb") as dst:
+            if stat.st_size < LARGE_FILE:
+                shutil.copyfileobj(src, dst)
+            else:
+                _kernel_copy(src, dst, stat.st_size)
+        os.chmod(tmp_path, 0o644)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, dest)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def sync_dir(source, destiny, manifest_path, use_hash=False, compressor=None):
+    old_assets = load_manifest(manifest_path).get("assets", {})
+    assets = {}
+    copied = 0
+
+    for rel_path, (path, stat) in sorted(scan_files(source).items()):
+        dest_path = os.path.join(destiny, rel_path)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        if use_hash:
+            entry["hash"] = hash_file(path)
+        assets[rel_path] = entry
+
+        old = old_assets.get(rel_path)
+        try:
+            dest_stat = os.stat(dest_path)
+        except FileNotFoundError:
+            dest_stat = None
+        if dest_stat is not None and dest_stat.st_size == stat.st_size and (
+                old is not None and old.get("hash") == entry["hash"] if use_hash
+                else dest_stat.st_mtime_ns == stat.st_mtime_ns):
+            if compressor is not None and not compressor.is_current(dest_path):
+                compressor.submit(dest_path)
+            continue
+        copy_file(path, dest_path, stat)
+        copied += 1
+        if compressor is not None:
+            compressor.submit(dest_path)
+
+    removed = 0
+    for rel_path in old_assets:
+        if rel_path not in assets:
+            remove_output(os.path.join(destiny, rel_path), destiny)
+            removed += 1
+
+    save_manifest(manifest_path, {"assets": assets})
+    return {"copied": copied, "unchanged": len(assets) - copied, "removed": removed}
@@ -0,0 +1,114 @@
+"""Benchmark suite: time each build stage on a synthetic corpus and compare with a baseline.
+
+Run from src/: python3 -m bench [--pages N] [--save-baseline]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from bench.corpus import generate_corpus
+from block import block_to_block_type, iter_blocks, markdown_to_html_node
+from generator import generate_pages_recursive
+from text_processing import text_to_textnodes
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def best_of(repeat, func, min_sample=0.1):
+    start = time.perf_counter()
+    func()
+    number = max(1, int(min_sample / max(time.perf_counter() - start, 1e-9)))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_suite(root, pages, depth, blocks, density, seed, repeat):
+    paths = generate_corpus(root, pages=pages, depth=depth, blocks=blocks, density=density, seed=seed)
+    sources = []
+    for path in paths:
+        with open(path) as f:
+            sources.append(f.read())
+    typed_blocks = [typed for source in sources for typed in iter_blocks(source.split("\n"))]
+    block_texts = [block for _, block in typed_blocks]
+    paragraphs = [block.replace("\n", " ") for block_type, block in typed_blocks if block_type.value == "paragraph"]
+    nodes = [markdown_to_html_node(source) for source in sources]
+
+    content = os.path.join(root, "content")
+    template = os.path.join(root, "template.html")
+    dest = os.path.join(root, "docs")
+    return {
+        "iter_blocks": best_of(repeat, lambda: [list(iter_blocks(s.split("\n"))) for s in sources]),
+        "block_to_block_type": best_of(repeat, lambda: [block_to_block_type(b) for b in block_texts]),
+        "text_to_textnodes": best_of(repeat, lambda: [text_to_textnodes(p) for p in paragraphs]),
+        "markdown_to_html_node": best_of(repeat, lambda: [markdown_to_html_node(s) for s in sources]),
+        "to_html": best_of(repeat, lambda: [node.to_html() for node in nodes]),
+        "build": best_of(repeat, lambda: generate_pages_recursive(content, template, dest, "/")),
+    }
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    print(f"{'stage':<24}{'ms':>10}{'baseline':>10}{'change':>9}")
+    for stage, seconds in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            print(f"{stage:<24}{seconds * 1000:>10.1f}{'-':>10}{'':>9}")
+            continue
+        change = seconds / base - 1
+        print(f"{stage:<24}{seconds * 1000:>10.1f}{base * 1000:>10.1f}{change:>+9.0%}")
+        if change > tolerance:
+            failures.append(f"{stage} is {change:.0%} slower than the baseline ({seconds * 1000:.1f} ms vs {base * 1000:.1f} ms)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the site generator on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--density", type=float, default=0.2, help="share of words with inline markup")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown before failing")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as root:
+        results = run_suite(root, args.pages, args.depth, args.blocks, args.density, args.seed, args.repeat)
+
+    corpus = {key: getattr(args, key) for key in ("pages", "depth", "blocks", "density", "seed")}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"corpus": corpus, "results": results}, f, indent=1)
+        compare(results, {}, args.tolerance)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get("corpus") == corpus:
+            baseline = stored["results"]
+        else:
+            print("baseline was recorded for a different corpus, not comparing")
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
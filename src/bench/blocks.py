@@ -0,0 +1,85 @@
+"""Time block_to_block_type against the regex-per-line classifier it replaced.
+
+Run from src/: python3 -m bench.blocks
+"""
+import random
+import re
+import timeit
+
+from block import BlockType, block_to_block_type
+
+
+def legacy_block_to_block_type(block):
+    match_headings = re.match(r"^\#{1,6} .+", block)
+    if match_headings:
+        return BlockType.HEAD
+
+    match_code = re.match(r"^\`\`\`.+\`\`\`$", block.strip(), re.DOTALL)
+    if match_code:
+        return BlockType.CODE
+
+    lines = block.split("\n")
+    quote = True
+    for line in lines:
+        match_quote = re.match(r"^\>", line)
+        if not match_quote:
+            quote = False
+            break
+    unordered = True
+    for line in lines:
+        match_unordered = re.match(r"^\-", line)
+        if not match_unordered:
+            unordered = False
+            break
+    ordered = True
+    for i in range(len(lines)):
+        if not lines[i].startswith(f"{i+1}. "):
+            ordered = False
+            break
+
+    if quote:
+        return BlockType.QUOTE
+    elif unordered:
+        return BlockType.UN_O_LIST
+    elif ordered:
+        return BlockType.O_LIST
+    return BlockType.PARAGRAPH
+
+
+def make_block(rng):
+    lines = rng.randint(1, 8)
+    kind = rng.choice(["paragraph", "heading", "code", "quote", "unordered", "ordered"])
+    if kind == "heading":
+        return "#" * rng.randint(1, 6) + " A heading about elves"
+    if kind == "code":
+        return "```\n" + "\n".join("x = compute(y)" for _ in range(lines)) + "\n```"
+    if kind == "quote":
+        return "\n".join("> quoted wisdom of the elders" for _ in range(lines))
+    if kind == "unordered":
+        return "\n".join("- an item in the list" for _ in range(lines))
+    if kind == "ordered":
+        return "\n".join(f"{i}. an item in the list" for i in range(1, lines + 1))
+    return "\n".join("Plain prose about the road that goes ever on." for _ in range(lines))
+
+
+def make_corpus(count=100_000, seed=0):
+    rng = random.Random(seed)
+    return [make_block(rng) for _ in range(count)]
+
+
+def run(count=100_000, repeat=3):
+    blocks = make_corpus(count)
+    for block in blocks:
+        if block_to_block_type(block) != legacy_block_to_block_type(block):
+            raise Exception(f"classifiers disagree on: {block[:80]!r}")
+
+    legacy = min(timeit.repeat(lambda: [legacy_block_to_block_type(b) for b in blocks], number=1, repeat=repeat))
+    current = min(timeit.repeat(lambda: [block_to_block_type(b) for b in blocks], number=1, repeat=repeat))
+    print(f"{len(blocks)} blocks")
+    print(f"regex per line:      {legacy * 1000:8.1f} ms")
+    print(f"first-char dispatch: {current * 1000:8.1f} ms")
+    print(f"speed-up:            {legacy / current:8.2f}x")
+
+
+if __name__ == "__main__":
+    run()
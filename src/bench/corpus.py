@@ -0,0 +1,91 @@
+"""Reproducible synthetic content trees for the benchmarks."""
+import os
+import random
+
+WORDS = ["elf", "ring", "mountain", "river", "song", "shadow", "star", "forest", "road", "hobbit",
+         "wizard", "tower", "lantern", "harbour", "willow", "ember"]
+
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 0.55,
+    "heading": 0.1,
+    "code": 0.08,
+    "quote": 0.07,
+    "unordered_list": 0.1,
+    "ordered_list": 0.1,
+}
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>"""
+
+
+def inline_text(rng, words, density):
+    parts = []
+    for i in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() >= density:
+            parts.append(word)
+            continue
+        kind = rng.randrange(5)
+        if kind == 0:
+            parts.append(f"**{word}**")
+        elif kind == 1:
+            parts.append(f"_{word}_")
+        elif kind == 2:
+            parts.append(f"`{word}`")
+        elif kind == 3:
+            parts.append(f"[{word}](/{word}/{i})")
+        else:
+            parts.append(f"![{word}](/images/{word}.png)")
+    return " ".join(parts)
+
+
+def make_block(rng, kind, density):
+    lines = rng.randint(1, 6)
+    if kind == "heading":
+        return "#" * rng.randint(2, 6) + " " + inline_text(rng, 5, density)
+    if kind == "code":
+        return "```\n" + "\n".join(f"{rng.choice(WORDS)} = {rng.choice(WORDS)}({i})" for i in range(lines)) + "\n```"
+    if kind == "quote":
+        return "\n".join("> " + inline_text(rng, 10, density) for _ in range(lines))
+    if kind == "unordered_list":
+        return "\n".join("- " + inline_text(rng, 8, density) for _ in range(lines))
+    if kind == "ordered_list":
+        return "\n".join(f"{i}. " + inline_text(rng, 8, density) for i in range(1, lines + 1))
+    return "\n".join(inline_text(rng, 16, density) for _ in range(lines))
+
+
+def make_page(rng, blocks, block_mix, density):
+    kinds = list(block_mix)
+    weights = [block_mix[kind] for kind in kinds]
+    body = [make_block(rng, kind, density) for kind in rng.choices(kinds, weights, k=blocks)]
+    return "\n\n".join(["# " + inline_text(rng, 4, 0)] + body) + "\n"
+
+
+def generate_corpus(root, pages=200, depth=2, blocks=40, block_mix=None, density=0.2, seed=0):
+    rng = random.Random(seed)
+    block_mix = block_mix or DEFAULT_BLOCK_MIX
+    content = os.path.join(root, "content")
+    paths = []
+    for i in range(pages):
+        sections = [f"section{rng.randrange(4)}" for _ in range(rng.randint(0, depth))]
+        path = os.path.join(content, *sections, f"page{i}", "index.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(make_page(rng, blocks, block_mix, density))
+        paths.append(path)
+
+    os.makedirs(os.path.join(root, "static"), exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), "w") as f:
+        f.write("body { margin: 0 auto; max-width: 40em; }\n")
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+    return paths
@@ -0,0 +1,89 @@
+"""Cold command line builds against builds served by a warm build daemon.
+
+Each round touches one page and runs an incremental build, once as a fresh
+`python3 main.py` process and once through client.py against `main.py daemon`.
+The synthetic corpus links to pages that do not exist; inline markup is off by
+default so thousands of broken link warnings do not dominate both timings.
+
+Run from src/: python3 -m bench.daemon [--pages N] [--rounds N] [--density D]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import client
+from bench.corpus import generate_corpus
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def touch(path, round_number):
+    with open(path, "a") as f:
+        f.write(f"\n\nround {round_number}\n")
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def wait_for_socket(socket_path, process, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise Exception("build daemon did not start")
+        time.sleep(0.01)
+
+
+def run(pages, rounds, density):
+    with tempfile.TemporaryDirectory() as root:
+        paths = generate_corpus(root, pages=pages, density=density)
+        cold_args = [sys.executable, os.path.join(SRC, "main.py"), "-q", "--incremental", "/"]
+        subprocess.run(cold_args, cwd=root, check=True, stderr=subprocess.DEVNULL)
+        cold = []
+        for i in range(rounds):
+            touch(paths[i % len(paths)], i)
+            cold.append(timed(lambda: subprocess.run(cold_args, cwd=root, check=True, stderr=subprocess.DEVNULL)))
+
+        socket_path = os.path.join(root, "build.sock")
+        daemon = subprocess.Popen([sys.executable, os.path.join(SRC, "main.py"), "daemon", "--socket", socket_path],
+                                  cwd=root, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_socket(socket_path, daemon)
+            client.build(["-q", "--incremental", "/"], socket_path, cwd=root)
+            warm = []
+            served = []
+            for i in range(rounds):
+                touch(paths[i % len(paths)], rounds + i)
+                client_args = [sys.executable, os.path.join(SRC, "client.py"), "--socket", socket_path,
+                               "-q", "--incremental", "/"]
+                warm.append(timed(lambda: subprocess.run(client_args, cwd=root, check=True,
+                                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)))
+                touch(paths[i % len(paths)], 2 * rounds + i)
+                served.append(client.build(["-q", "--incremental", "/"], socket_path, cwd=root)["elapsed"])
+        finally:
+            client.stop(socket_path)
+            daemon.wait()
+
+    cold_ms = min(cold) * 1000
+    print(f"{pages} pages, best of {rounds} rounds")
+    print(f"{'cold process':<24}{cold_ms:>10.1f} ms")
+    print(f"{'client + warm daemon':<24}{min(warm) * 1000:>10.1f} ms  ({min(warm) * 1000 / cold_ms:.0%} of cold)")
+    print(f"{'build inside daemon':<24}{min(served) * 1000:>10.1f} ms  ({min(served) * 1000 / cold_ms:.0%} of cold)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark warm daemon builds against cold builds")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--density", type=float, default=0.0, help="share of inline markup in the corpus")
+    args = parser.parse_args(argv)
+    run(args.pages, args.rounds, args.density)
+
+
+if __name__ == "__main__":
+    main()
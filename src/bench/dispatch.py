@@ -0,0 +1,68 @@
+"""Compare renderer-registry dispatch with the if/elif chains it replaced.
+
+Run from src/: python3 -m bench.dispatch
+"""
+import random
+import timeit
+
+from bench.corpus import make_page, DEFAULT_BLOCK_MIX
+from block import (BlockType, block_to_html_node, code_block_to_html, heading_block_to_html, iter_blocks,
+                   o_block_to_html, paragraph_block_to_html, quote_block_to_html, un_o_block_to_html)
+from htmlnode import LeafNode
+from text_processing import text_node_to_html_node, text_to_textnodes
+from textnode import TextType
+
+
+def legacy_block_to_html_node(block, block_type):
+    if block_type == BlockType.PARAGRAPH:
+        return paragraph_block_to_html(block)
+    elif block_type == BlockType.HEAD:
+        return heading_block_to_html(block)
+    elif block_type == BlockType.QUOTE:
+        return quote_block_to_html(block)
+    elif block_type == BlockType.UN_O_LIST:
+        return un_o_block_to_html(block)
+    elif block_type == BlockType.O_LIST:
+        return o_block_to_html(block)
+    elif block_type == BlockType.CODE:
+        return code_block_to_html(block)
+
+
+def legacy_text_node_to_html_node(text_node):
+    if text_node.text_type not in TextType:
+        raise TypeError
+    if text_node.text_type == TextType.TEXT:
+        return LeafNode(tag=None, value=text_node.text)
+    elif text_node.text_type == TextType.BOLD:
+        return LeafNode("b", text_node.text)
+    elif text_node.text_type == TextType.ITALIC:
+        return LeafNode("i", text_node.text)
+    elif text_node.text_type == TextType.CODE:
+        return LeafNode("code", text_node.text)
+    elif text_node.text_type == TextType.LINK:
+        return LeafNode("a", text_node.text, {"href": text_node.url})
+    elif text_node.text_type == TextType.IMAGE:
+        return LeafNode("img", '', {"src": text_node.url, "alt": text_node.text})
+
+
+def run(pages=50, repeat=5):
+    rng = random.Random(0)
+    typed_blocks = [typed for _ in range(pages)
+                    for typed in iter_blocks(make_page(rng, 40, DEFAULT_BLOCK_MIX, 0.4).split("\n"))]
+    text_nodes = [node for block_type, block in typed_blocks if block_type == BlockType.PARAGRAPH
+                  for node in text_to_textnodes(block.replace("\n", " "))]
+
+    def time_it(func):
+        return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+    print(f"{len(text_nodes)} text nodes, {len(typed_blocks)} blocks")
+    legacy = time_it(lambda: [legacy_text_node_to_html_node(n) for n in text_nodes])
+    registry = time_it(lambda: [text_node_to_html_node(n) for n in text_nodes])
+    print(f"inline  if/elif: {legacy:8.2f} ms  registry: {registry:8.2f} ms  speed-up: {legacy / registry:5.2f}x")
+    legacy = time_it(lambda: [legacy_block_to_html_node(b, t) for t, b in typed_blocks])
+    registry = time_it(lambda: [block_to_html_node(b, t) for t, b in typed_blocks])
+    print(f"blocks  if/elif: {legacy:8.2f} ms  registry: {registry:8.2f} ms  speed-up: {legacy / registry:5.2f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,118 @@
+"""Cost of HTML escaping on serialization and on the full build.
+
+Times to_html and a full generate_pages_recursive run on a synthetic corpus,
+once as shipped and once with the serializer as it was before escaping, and
+prints the overhead escaping adds.
+
+Run from src/: python3 -m bench.escape [--pages N] [--special 0.05]
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+
+import htmlnode
+import template
+from bench.corpus import generate_corpus
+from block import markdown_to_html_node
+from generator import generate_pages_recursive
+
+
+def cpu_time(func):
+    # CPU rather than wall time: on a busy machine the wall clock swings by more than escaping costs
+    gc.collect()
+    start = time.process_time()
+    func()
+    return time.process_time() - start
+
+
+def unescaped_render(self, write):
+    if self.value is None:
+        raise ValueError
+    if self.tag is None:
+        write(self.value)
+    else:
+        write(f'<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>')
+
+
+def unescaped_props_to_html(self):
+    if self.props is None:
+        return ''
+    return ''.join([f' {key}="{val}"' for key, val in self.props.items()])
+
+
+@contextmanager
+def escaping_disabled():
+    # the serializer as it was before escaping, swapped in for the comparison
+    saved = htmlnode.LeafNode.render, htmlnode.HTMLNode.props_to_html, template.escape_text
+    htmlnode.LeafNode.render = unescaped_render
+    htmlnode.HTMLNode.props_to_html = unescaped_props_to_html
+    template.escape_text = str
+    try:
+        yield
+    finally:
+        htmlnode.LeafNode.render, htmlnode.HTMLNode.props_to_html, template.escape_text = saved
+
+
+def sprinkle_specials(paths, share, seed):
+    # the corpus has no <, > or & of its own; put some into a share of the paragraphs
+    rng = random.Random(seed)
+    for path in paths:
+        with open(path) as f:
+            blocks = f.read().split("\n\n")
+        for i, block in enumerate(blocks):
+            if block[:1].isalpha() and rng.random() < share:
+                blocks[i] = block + " where a < b & c > d"
+        with open(path, "w") as f:
+            f.write("\n\n".join(blocks))
+
+
+def run(pages, share, repeat, seed):
+    with tempfile.TemporaryDirectory() as root:
+        paths = generate_corpus(root, pages=pages, seed=seed)
+        sprinkle_specials(paths, share, seed)
+        sources = []
+        for path in paths:
+            with open(path) as f:
+                sources.append(f.read())
+        nodes = [markdown_to_html_node(source) for source in sources]
+        content = os.path.join(root, "content")
+        template_path = os.path.join(root, "template.html")
+
+        # each variant builds into its own docs/ so neither pays for rewriting the other's output
+        stages = {
+            "to_html": lambda dest: [node.to_html() for node in nodes],
+            "build": lambda dest: generate_pages_recursive(content, template_path, dest, "/"),
+        }
+        print(f"{pages} pages, {share:.0%} of paragraphs with special characters")
+        print(f"{'stage':<10}{'escaped cpu ms':>16}{'raw cpu ms':>12}{'overhead':>10}")
+        for name, func in stages.items():
+            escaped_dest = os.path.join(root, "docs-escaped")
+            raw_dest = os.path.join(root, "docs-raw")
+            escaped = []
+            raw = []
+            # interleaved so drift in machine load hits both variants alike
+            for _ in range(repeat):
+                escaped.append(cpu_time(lambda: func(escaped_dest)))
+                with escaping_disabled():
+                    raw.append(cpu_time(lambda: func(raw_dest)))
+            escaped, raw = min(escaped), min(raw)
+            print(f"{name:<10}{escaped * 1000:>16.2f}{raw * 1000:>12.2f}{(escaped - raw) / raw:>10.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the overhead of HTML escaping")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--special", type=float, default=0.05,
+                        help="share of paragraphs that contain < and &")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    run(args.pages, args.special, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Compare text_to_textnodes with the split_nodes_* cascade it replaced.
+
+Run from src/: python3 -m bench.inline
+"""
+import random
+import timeit
+
+from block import markdown_to_blocks
+from text_processing import split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes
+from textnode import TextNode, TextType
+
+WORDS = ["elf", "ring", "mountain", "river", "song", "shadow", "star", "forest", "road", "hobbit"]
+
+
+def cascade_text_to_textnodes(text):
+    nodes = split_nodes_image([TextNode(text, TextType.TEXT)])
+    nodes = split_nodes_link(nodes)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    return split_nodes_delimiter(nodes, "`", TextType.CODE)
+
+
+def make_paragraph(rng, words=120):
+    parts = []
+    for i in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.05:
+            parts.append(f"**{word}**")
+        elif roll < 0.10:
+            parts.append(f"_{word}_")
+        elif roll < 0.13:
+            parts.append(f"`{word}`")
+        elif roll < 0.14:
+            parts.append(f"![{word}](/images/{word}.png)")
+        elif roll < 0.16:
+            parts.append(f"[{word}](https://example.com/{word}/{i})")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def make_document(paragraphs=200, seed=0):
+    rng = random.Random(seed)
+    return "\n\n".join(make_paragraph(rng) for _ in range(paragraphs))
+
+
+def run(paragraphs=200, repeat=5):
+    blocks = markdown_to_blocks(make_document(paragraphs))
+    for block in blocks:
+        if text_to_textnodes(block) != cascade_text_to_textnodes(block):
+            raise Exception(f"scanner output differs from the cascade for: {block[:80]}")
+
+    cascade = min(timeit.repeat(lambda: [cascade_text_to_textnodes(b) for b in blocks], number=1, repeat=repeat))
+    scanner = min(timeit.repeat(lambda: [text_to_textnodes(b) for b in blocks], number=1, repeat=repeat))
+    print(f"{len(blocks)} paragraphs")
+    print(f"split_nodes_* cascade: {cascade * 1000:8.2f} ms")
+    print(f"single-pass scanner:   {scanner * 1000:8.2f} ms")
+    print(f"speed-up:              {cascade / scanner:8.2f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,121 @@
+"""Source reading, output writing and asset copying across file sizes.
+
+Compares the plain read()/write()/shutil.copy paths with the mmap line
+source, the chunked os.writev writer and the kernel copy used by the build.
+
+Run from src/: python3 -m bench.io [--max-size 500M]
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from assets import copy_file
+from block import iter_blocks
+from fileio import ChunkBuffer, open_source, write_chunks
+
+SIZES = ["1K", "64K", "1M", "16M", "128M", "500M"]
+UNITS = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+PARAGRAPH = "Plain prose about the road that goes ever on, with a [link](/blog/tom) and some **bold** words.\n\n"
+
+
+def parse_size(text):
+    if text[-1].upper() in UNITS:
+        return int(text[:-1]) * UNITS[text[-1].upper()]
+    return int(text)
+
+
+def best_time(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_source(path, size):
+    with open(path, "w") as f:
+        f.write("# Large page\n\n")
+        written = 0
+        block = PARAGRAPH * 1000
+        while written < size:
+            f.write(block[:size - written])
+            written += len(block)
+
+
+def read_whole(path):
+    with open(path, "r") as f:
+        return sum(1 for _ in iter_blocks(f.read().split("\n")))
+
+
+def read_mapped(path):
+    with open_source(path, threshold=0) as lines:
+        return sum(1 for _ in iter_blocks(lines))
+
+
+def html_parts(size):
+    part = "<p>Plain prose about the road that goes <b>ever</b> on.</p>"
+    return [part] * (size // len(part) + 1)
+
+
+def write_joined(path, parts):
+    buffer = io.StringIO()
+    for part in parts:
+        buffer.write(part)
+    with open(path, "w") as f:
+        f.write(buffer.getvalue())
+
+
+def write_vectored(path, parts):
+    buffer = ChunkBuffer()
+    for part in parts:
+        buffer.write(part)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        write_chunks(fd, buffer.getchunks())
+    finally:
+        os.close(fd)
+
+
+def run(sizes, repeat):
+    print(f"{'size':>6} {'stage':<8}{'plain ms':>12}{'layer ms':>12}{'plain MB/s':>12}{'layer MB/s':>12}")
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "page.md")
+        output = os.path.join(root, "page.html")
+        copy = os.path.join(root, "copy.png")
+        for label in sizes:
+            size = parse_size(label)
+            make_source(source, size)
+            if read_whole(source) != read_mapped(source):
+                raise Exception(f"mmap source yields different blocks at {label}")
+            parts = html_parts(size)
+            stat = os.stat(source)
+            rows = [
+                ("read", lambda: read_whole(source), lambda: read_mapped(source)),
+                ("write", lambda: write_joined(output, parts), lambda: write_vectored(output, parts)),
+                ("copy", lambda: shutil.copy(source, copy), lambda: copy_file(source, copy, stat)),
+            ]
+            for stage, plain, layer in rows:
+                plain_time = best_time(repeat, plain)
+                layer_time = best_time(repeat, layer)
+                megabytes = size / (1024 * 1024)
+                print(f"{label:>6} {stage:<8}{plain_time * 1000:>12.2f}{layer_time * 1000:>12.2f}"
+                      f"{megabytes / plain_time:>12.1f}{megabytes / layer_time:>12.1f}")
+            del parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the build's file I/O layer across file sizes")
+    parser.add_argument("--max-size", default="16M", help="largest size to run, up to 500M (default 16M)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    limit = parse_size(args.max_size)
+    run([label for label in SIZES if parse_size(label) <= limit], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
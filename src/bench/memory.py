@@ -0,0 +1,70 @@
+"""Bytes per node for the slotted node classes against dict-backed ones.
+
+Run from src/: python3 -m bench.memory
+"""
+import tracemalloc
+
+from bench.inline import make_document
+from block import markdown_to_html_node
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode, TextType
+
+
+class DictTextNode():
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictLeafNode():
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+class DictParentNode():
+    def __init__(self, tag, children, props=None):
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
+
+
+def measure(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding the nodes is not part of the node cost
+    return (after - before - nodes.__sizeof__()) / count
+
+
+def measure_document(paragraphs):
+    markdown = make_document(paragraphs)
+    tracemalloc.start()
+    node = markdown_to_html_node(markdown)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return node, peak
+
+
+def run(count=100_000):
+    cases = [
+        ("TextNode", lambda i: DictTextNode("word", TextType.TEXT), lambda i: TextNode("word", TextType.TEXT)),
+        ("LeafNode", lambda i: DictLeafNode("b", "word"), lambda i: LeafNode("b", "word")),
+        ("ParentNode", lambda i: DictParentNode("p", None), lambda i: ParentNode("p", None)),
+    ]
+    print(f"{'class':<12}{'dict bytes/node':>18}{'slots bytes/node':>18}")
+    for name, before, after in cases:
+        print(f"{name:<12}{measure(before, count):>18.1f}{measure(after, count):>18.1f}")
+
+    _, peak = measure_document(2000)
+    print(f"peak while parsing a 2000-paragraph document: {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    run()
@@ -2,7 +2,7 @@ from enum import Enum
 import re
 
 from htmlnode import ParentNode
-from text_processing import text_to_textnodes, text_node_to_html_node
+from text_processing import INLINE_RENDERERS, PLAIN_RENDERERS, text_to_textnodes, text_node_to_html_node
 from textnode import TextType, TextNode
 
 class BlockType(Enum):
@@ -22,47 +22,112 @@ def markdown_to_blocks(markdown):
     return blocks
 
 
-def block_to_block_type(block):
-    match_headings = re.match(r"^\#{1,6} .+", block)
-    if match_headings:
+def iter_blocks(lines):
+    lines = iter(lines)
+    block_lines = []
+    literal_opener = False
+    while True:
+        in_fence = False
+        for line in lines:
+            line = line.rstrip("\n")
+            if in_fence:
+                block_lines.append(line)
+                if line.rstrip().endswith("```"):
+                    in_fence = False
+                continue
+            if line == "":
+                if block_lines:
+                    block = "\n".join(block_lines).strip()
+                    block_lines = []
+                    if block:
+                        yield block_to_block_type(block), block
+                continue
+            stripped = line.strip()
+            if stripped.startswith("```") and not (len(stripped) > 3 and stripped.endswith("```")):
+                if literal_opener:
+                    literal_opener = False
+                else:
+                    in_fence = True
+                    fence_start = len(block_lines)
+            block_lines.append(line)
+        if not in_fence:
+            break
+        # the source ended inside a fence, so it was never code: read its lines again as plain text,
+        # taking the opening line literally
+        lines = iter(block_lines[fence_start:])
+        del block_lines[fence_start:]
+        literal_opener = True
+    block = "\n".join(block_lines).strip()
+    if block:
+        yield block_to_block_type(block), block
+
+
+HEADING_PATTERN = re.compile(r"#{1,6} .")
+
+
+def _classify_paragraph(block):
+    return BlockType.PARAGRAPH
+
+
+def _classify_heading(block):
+    if HEADING_PATTERN.match(block):
         return BlockType.HEAD
-    
-    match_code = re.match(r"^\`\`\`.+\`\`\`$", block.strip(), re.DOTALL)
-    if match_code:
+    return BlockType.PARAGRAPH
+
+
+def _classify_code(block):
+    stripped = block.strip()
+    if len(stripped) >= 7 and stripped.startswith("```") and stripped.endswith("```"):
         return BlockType.CODE
+    return BlockType.PARAGRAPH
 
-    lines = block.split("\n")
-    quote = True
-    for line in lines:
-        match_quote = re.match(r"^\>", line)
-        if not match_quote:
-            quote = False
-            break
-    unordered = True
-    for line in lines:
-        match_unordered = re.match(r"^\-", line)
-        if not match_unordered:
-            unordered = False
-            break
-    ordered = True
-    for i in range(len(lines)):
-        if not lines[i].startswith(f"{i+1}. "):
-            ordered = False
-            break
 
-    if quote:
+def _classify_quote(block):
+    if block.count("\n") == block.count("\n>"):
         return BlockType.QUOTE
-    elif unordered:
+    return BlockType.PARAGRAPH
+
+
+def _classify_unordered(block):
+    if block.count("\n") == block.count("\n-"):
         return BlockType.UN_O_LIST
-    elif ordered:
-        return BlockType.O_LIST
+    return BlockType.PARAGRAPH
+
+
+def _classify_ordered(block):
+    number = 1
+    for line in block.split("\n"):
+        if not line.startswith(f"{number}. "):
+            return BlockType.PARAGRAPH
+        number += 1
+    return BlockType.O_LIST
+
+
+BLOCK_CLASSIFIERS = {
+    "#": _classify_heading,
+    "`": _classify_code,
+    ">": _classify_quote,
+    "-": _classify_unordered,
+    "1": _classify_ordered,
+}
+
+
+def block_to_block_type(block):
+    first = block[:1]
+    classify = BLOCK_CLASSIFIERS.get(first)
+    if classify is not None:
+        return classify(block)
+    if first.isspace():
+        return _classify_code(block)
     return BlockType.PARAGRAPH
 
 def text_to_children(text):
+    # one check for the whole text: when it holds no "<" or "&", none of its runs need escaping
+    renderers = INLINE_RENDERERS if "<" in text or "&" in text else PLAIN_RENDERERS
     block_nodes = text_to_textnodes(text)
     list_of_nodes = []
     for node in block_nodes:
-        list_of_nodes.append(text_node_to_html_node(node))
+        list_of_nodes.append(text_node_to_html_node(node, renderers))
     return list_of_nodes
 
 def paragraph_block_to_html(block):
@@ -94,25 +159,24 @@ def quote_block_to_html(block):
     children = text_to_children(clean_text)
     return ParentNode("blockquote", children=children)
 
-def un_o_block_to_html(block):
+def list_block_to_html(block, tag):
     lines = block.split('\n')
     list_item_nodes = []
     for line in lines:
-        clean_text = line[2:].strip()
+        if tag == "ol":
+            clean_text = line[line.find(". ") + 2:].strip()
+        else:
+            clean_text = line[2:].strip()
         children_of_li = text_to_children(clean_text)
         li_node = ParentNode("li", children_of_li)
         list_item_nodes.append(li_node)
-    return ParentNode("ul", children=list_item_nodes)
+    return ParentNode(tag, children=list_item_nodes)
+
+def un_o_block_to_html(block):
+    return list_block_to_html(block, "ul")
 
 def o_block_to_html(block):
-    lines = block.split('\n')
-    list_item_nodes = []
-    for line in lines:
-        clean_text = line[2:].strip()
-        children_of_li = text_to_children(clean_text)
-        li_node = ParentNode("li", children_of_li)
-        list_item_nodes.append(li_node)
-    return ParentNode("ol", children=list_item_nodes)
+    return list_block_to_html(block, "ol")
 
 def code_block_to_html(block):
     clean_text = block.strip("```").rstrip("```").strip()
@@ -120,32 +184,42 @@ def code_block_to_html(block):
     return ParentNode("pre", children=[code_node])
 
 
+BLOCK_RENDERERS = {
+    BlockType.PARAGRAPH: paragraph_block_to_html,
+    BlockType.HEAD: heading_block_to_html,
+    BlockType.QUOTE: quote_block_to_html,
+    BlockType.UN_O_LIST: un_o_block_to_html,
+    BlockType.O_LIST: o_block_to_html,
+    BlockType.CODE: code_block_to_html,
+}
+
+
+def register_block_type(block_type, renderer, first_chars="", matches=None):
+    BLOCK_RENDERERS[block_type] = renderer
+    for char in first_chars:
+        fallback = BLOCK_CLASSIFIERS.get(char)
+        if fallback is None:
+            fallback = _classify_code if char.isspace() else _classify_paragraph
+
+        def classify(block, fallback=fallback):
+            if matches(block):
+                return block_type
+            return fallback(block)
+        BLOCK_CLASSIFIERS[char] = classify
+
+
 def block_to_html_node(block, block_type):
-    if block_type == BlockType.PARAGRAPH:
-        return paragraph_block_to_html(block)
-
-    elif block_type == BlockType.HEAD:
-        return heading_block_to_html(block)
-        
-    elif block_type == BlockType.QUOTE:
-        return quote_block_to_html(block)
-        
-    elif block_type == BlockType.UN_O_LIST:
-        return un_o_block_to_html(block)
-        
-    elif block_type == BlockType.O_LIST:
-        return o_block_to_html(block)
-        
-    elif block_type == BlockType.CODE:
-        return code_block_to_html(block)
-    
+    renderer = BLOCK_RENDERERS.get(block_type)
+    if renderer is None:
+        raise ValueError(f"no renderer for block type {block_type}")
+    return renderer(block)
+
+
+def blocks_to_html_nodes(typed_blocks):
+    for block_type, block in typed_blocks:
+        yield block_to_html_node(block, block_type)
+
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    block_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        html_node = block_to_html_node(block, block_type) 
-        block_nodes.append(html_node)
-
-    return ParentNode(tag="div", children=block_nodes)
\ No newline at end of file
+    block_nodes = list(blocks_to_html_nodes(iter_blocks(markdown.split("\n"))))
+    return ParentNode(tag="div", children=block_nodes)
@@ -0,0 +1,53 @@
+import json
+import os
+import socket
+import sys
+
+# kept free of the build modules: the point of the client is to start faster than a cold build
+SOCKET_PATH = '.cache/build.sock'
+
+
+def request(message, socket_path=SOCKET_PATH, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise Exception(f"build server on {socket_path} closed the connection")
+    return json.loads(line)
+
+
+def build(argv, socket_path=SOCKET_PATH, cwd=None):
+    return request({"argv": list(argv), "cwd": os.path.abspath(cwd or os.getcwd())}, socket_path)
+
+
+def stop(socket_path=SOCKET_PATH):
+    return request({"command": "stop"}, socket_path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    socket_path = SOCKET_PATH
+    if argv[:1] == ['--socket']:
+        socket_path, argv = argv[1], argv[2:]
+    if argv == ['--stop']:
+        response = stop(socket_path)
+    else:
+        response = build(argv, socket_path)
+
+    for record in response.get("log", []):
+        print(record["message"], file=sys.stderr)
+    if response.get("output"):
+        print(response["output"], end="", file=sys.stderr)
+    if not response["ok"]:
+        print(response["error"], file=sys.stderr)
+        return 1
+    if "result" in response:
+        print(json.dumps({"elapsed": response["elapsed"], "result": response["result"]}, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from fileio import chunks_size
+from output import COMPRESSED_SUFFIXES, remove_siblings, temp_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MIN_SIZE = 1024
+READ_SIZE = 1 << 16
+COMPRESSIBLE = {".html", ".htm", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map"}
+
+
+def _gzip():
+    # wbits 31 writes a gzip header with no file name and a zero mtime, the temp file's name stays out of it
+    return zlib.compressobj(9, zlib.DEFLATED, 31)
+
+
+class _Brotli():
+    # brotli's Compressor under the compress/flush names zlib and zstandard use
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=11)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def _zstd():
+    return zstandard.ZstdCompressor(level=19).compressobj()
+
+
+COMPRESSORS = {"gz": _gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = _Brotli
+if zstandard is not None:
+    COMPRESSORS["zst"] = _zstd
+
+
+class CompressedStream():
+    # compresses a file while its bytes are still in memory: every chunk written to the file is also fed to
+    # one compressor per format, each writing a temp file that close() renames over its sibling. Chunks are
+    # held back only until the file reaches min_size, a file that stays smaller gets no siblings at all
+    def __init__(self, compressor, path):
+        self.compressor = compressor
+        self.path = path
+        self.compressible = os.path.splitext(path)[1].lower() in COMPRESSIBLE
+        self.size = 0
+        self.pending = []
+        self.outputs = None
+
+    def write(self, chunks):
+        if not self.compressible:
+            return
+        if self.outputs is None:
+            self.pending.extend(chunks)
+            self.size += chunks_size(chunks)
+            if self.size < self.compressor.min_size:
+                return
+            chunks, self.pending = self.pending, []
+            self.outputs = []
+            for name in self.compressor.formats:
+                fd, tmp_path = temp_file(self.path + "." + name)
+                self.outputs.append((COMPRESSORS[name](), open(fd, "wb"), tmp_path))
+        else:
+            self.size += chunks_size(chunks)
+        for stream, f, _ in self.outputs:
+            for chunk in chunks:
+                f.write(stream.compress(chunk))
+
+    def close(self, mtime_ns):
+        if self.outputs is None:
+            # a file that shrank below min_size must not go on serving its old compressed copies
+            remove_siblings(self.path)
+            return
+        try:
+            for stream, f, tmp_path in self.outputs:
+                f.write(stream.flush())
+                f.close()
+                os.chmod(tmp_path, 0o644)
+                # siblings carry the mtime of the file they were made from, that is how later builds spot stale ones
+                os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+            for name, (_, _, tmp_path) in zip(self.compressor.formats, self.outputs):
+                os.replace(tmp_path, self.path + "." + name)
+            self.outputs = []
+        finally:
+            self.abort()
+        with self.compressor.lock:
+            self.compressor.compressed += 1
+
+    def abort(self):
+        for _, f, tmp_path in self.outputs or []:
+            f.close()
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self.outputs = None
+        self.pending = []
+
+
+class Compressor():
+    def __init__(self, formats=None, min_size=MIN_SIZE, workers=None):
+        formats = list(COMPRESSORS) if formats is None else list(formats)
+        for name in formats:
+            if name not in COMPRESSORS:
+                raise ValueError(f"compression format {name} is not available")
+        self.formats = formats
+        self.min_size = min_size
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.compressed = 0
+        self.lock = threading.Lock()
+        self.pool = None
+        self.futures = []
+
+    def __getstate__(self):
+        # pool workers compress inline, they already run in parallel
+        return {"formats": self.formats, "min_size": self.min_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["formats"], state["min_size"], workers=1)
+
+    def suffixes(self):
+        return ["." + name for name in self.formats]
+
+    def wants(self, path, size):
+        return size >= self.min_size and os.path.splitext(path)[1].lower() in COMPRESSIBLE
+
+    def siblings(self, path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return []
+        if not self.wants(path, size):
+            return []
+        return [path + suffix for suffix in self.suffixes()]
+
+    def is_current(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        if not self.wants(path, stat.st_size):
+            return not any(os.path.exists(path + suffix) for suffix in COMPRESSED_SUFFIXES)
+        for suffix in self.suffixes():
+            try:
+                if os.stat(path + suffix).st_mtime_ns != stat.st_mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def stream(self, path):
+        return CompressedStream(self, path)
+
+    def submit(self, path, chunks=None):
+        # chunks are the bytes just written to path, without them the file is read back from disk
+        if self.workers <= 1:
+            self._compress(path, chunks)
+            return
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers)
+            self.futures.append(self.pool.submit(self._compress, path, chunks))
+
+    def _compress(self, path, chunks=None):
+        stream = self.stream(path)
+        try:
+            if chunks is not None:
+                stream.write(chunks)
+                mtime_ns = os.stat(path).st_mtime_ns
+            else:
+                # streamed from the file, a large asset is never held in memory whole
+                with open(path, "rb") as src:
+                    mtime_ns = os.fstat(src.fileno()).st_mtime_ns
+                    for chunk in iter(lambda: src.read(READ_SIZE), b""):
+                        stream.write([chunk])
+        except BaseException:
+            stream.abort()
+            raise
+        stream.close(mtime_ns)
+
+    def close(self):
+        with self.lock:
+            futures, self.futures = self.futures, []
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
@@ -0,0 +1,107 @@
+import contextlib
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import time
+
+# builds are served one at a time, so a client that connects and never finishes its request line must not
+# hold the server for long
+REQUEST_TIMEOUT = 10
+
+
+class LogCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append({"level": record.levelname, "message": record.getMessage()})
+
+
+def claim_socket(socket_path):
+    if not os.path.exists(socket_path):
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # left behind by a server that did not shut down cleanly
+            os.unlink(socket_path)
+            return
+    raise Exception(f"a build server is already listening on {socket_path}")
+
+
+class BuildHandler(socketserver.StreamRequestHandler):
+    timeout = REQUEST_TIMEOUT
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+        except TimeoutError:
+            return
+        if not line:
+            # a connection probe from claim_socket
+            return
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            response = {"ok": False, "error": f"invalid request: {e}"}
+        else:
+            if message.get("command") == "stop":
+                self.server.stopping = True
+                response = {"ok": True}
+            else:
+                response = self.server.run_build(message.get("argv", []), message.get("cwd", os.getcwd()))
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class BuildServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path, build):
+        claim_socket(socket_path)
+        self.socket_path = os.path.abspath(socket_path)
+        # build(argv, session) runs one build; session is a dict that lives as long as the server, one per site
+        self.build = build
+        self.sessions = {}
+        self.stopping = False
+        super().__init__(socket_path, BuildHandler)
+
+    def run_build(self, argv, cwd):
+        collector = LogCollector()
+        output = io.StringIO()
+        root = logging.getLogger()
+        previous = os.getcwd()
+        start = time.perf_counter()
+        root.addHandler(collector)
+        try:
+            os.chdir(cwd)
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                result = self.build(argv, self.sessions.setdefault(cwd, {}))
+            response = {"ok": True, "result": result}
+        except SystemExit as e:
+            # argparse exits on --help and on bad arguments
+            response = {"ok": e.code in (0, None), "error": f"exit status {e.code}"}
+        except Exception as e:
+            response = {"ok": False, "error": str(e) or type(e).__name__}
+        finally:
+            os.chdir(previous)
+            root.removeHandler(collector)
+        response["elapsed"] = time.perf_counter() - start
+        response["log"] = collector.records
+        response["output"] = output.getvalue()
+        return response
+
+    def run(self):
+        # builds are served one at a time: each one changes directory and owns docs/
+        try:
+            while not self.stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
@@ -0,0 +1,111 @@
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+
+MMAP_THRESHOLD = 4 * 1024 * 1024
+PARTS_PER_CHUNK = 4096
+FLUSH_CHARS = 64 * 1024
+
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def _mapped_lines(mapped):
+    # decode one line at a time so only the lines iter_blocks is holding live as str
+    for line in iter(mapped.readline, b""):
+        if line.endswith(b"\r\n"):
+            line = line[:-2] + b"\n"
+        yield line.decode("utf-8")
+
+
+@contextmanager
+def open_source(path, threshold=MMAP_THRESHOLD):
+    size = os.path.getsize(path)
+    if size < threshold or size == 0:
+        with open(path, "r") as f:
+            yield f
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        yield _mapped_lines(mapped)
+
+
+class ChunkBuffer():
+    # parts are encoded a few thousand at a time as they come in, the joins run in C and the page is held
+    # once, as bytes, rather than as millions of small str objects
+    def __init__(self, parts_per_chunk=PARTS_PER_CHUNK):
+        self.parts_per_chunk = parts_per_chunk
+        self.parts = []
+        self.chunks = []
+
+    def write(self, text):
+        parts = self.parts
+        parts.append(text)
+        if len(parts) >= self.parts_per_chunk:
+            self.chunks.append("".join(parts).encode("utf-8"))
+            parts.clear()
+
+    def getchunks(self):
+        if self.parts:
+            self.chunks.append("".join(self.parts).encode("utf-8"))
+            self.parts.clear()
+        return self.chunks
+
+
+class ChunkWriter():
+    # streams str parts to sink: once about flush_chars have built up they are encoded in groups like
+    # ChunkBuffer's and handed to sink as a list of bytes, size counts everything written so far
+    def __init__(self, sink, flush_chars=FLUSH_CHARS, parts_per_chunk=PARTS_PER_CHUNK):
+        self.sink = sink
+        self.flush_chars = flush_chars
+        self.parts_per_chunk = parts_per_chunk
+        self.parts = []
+        self.pending = 0
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.pending >= self.flush_chars:
+            self.flush()
+
+    def flush(self):
+        parts = self.parts
+        step = self.parts_per_chunk
+        chunks = [("".join(parts[i:i + step])).encode("utf-8") for i in range(0, len(parts), step)]
+        self.parts = []
+        self.pending = 0
+        self.size += chunks_size(chunks)
+        self.sink(chunks)
+
+
+def chunks_size(chunks):
+    return sum(len(chunk) for chunk in chunks)
+
+
+def hash_chunks(chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_chunks(fd, chunks):
+    views = [memoryview(chunk) for chunk in chunks if chunk]
+    if not hasattr(os, "writev"):
+        for view in views:
+            while view:
+                view = view[os.write(fd, view):]
+        return
+    first = 0
+    while first < len(views):
+        written = os.writev(fd, views[first:first + IOV_MAX])
+        while first < len(views) and written >= len(views[first]):
+            written -= len(views[first])
+            first += 1
+        if written:
+            views[first] = views[first][written:]
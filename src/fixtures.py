@@ -0,0 +1,8 @@
+import os
+
+
+# shared by the tests that lay out a site in a temporary directory
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
@@ -0,0 +1,27 @@
+import itertools
+
+FRONT_MATTER_FENCE = "---"
+
+
+def parse_front_matter(lines):
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, iter(())
+    if first.rstrip("\n") != FRONT_MATTER_FENCE:
+        return {}, itertools.chain([first], lines)
+
+    buffered = [first]
+    metadata = {}
+    for line in lines:
+        buffered.append(line)
+        line = line.rstrip("\n")
+        if line == FRONT_MATTER_FENCE:
+            return metadata, lines
+        if line.strip() == "":
+            continue
+        key, sep, value = line.partition(":")
+        if not sep or not key.strip():
+            break
+        metadata[key.strip().lower()] = value.strip()
+    return {}, itertools.chain(buffered, lines)
@@ -1,8 +1,23 @@
+import asyncio
+import itertools
+import logging
 import os
-import shutil
-import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from block import markdown_to_html_node
+from assets import copy_file
+from block import block_to_html_node, iter_blocks
+from fileio import ChunkBuffer, open_source
+from frontmatter import parse_front_matter
+from htmlnode import ParentNode, RawNode
+from profiler import BuildProfiler
+from manifest import hash_file, hash_text, load_manifest, save_manifest
+from output import OutputWriter
+from template import TemplateLoader, rewrite_urls
+from text_processing import collect_links, record_links
+
+GENERATOR_VERSION = "7"
+
+logger = logging.getLogger(__name__)
 
 
 def copy_dir(source, destiny):
@@ -10,54 +25,374 @@ def copy_dir(source, destiny):
     for item in elements_in_source:
         path_to_item = os.path.join(source, item)
         if os.path.isfile(path_to_item):
-            shutil.copy(path_to_item, destiny)
+            copy_file(path_to_item, os.path.join(destiny, item), os.stat(path_to_item))
         else:
             path_to_dir = os.path.join(destiny, item)
-            os.mkdir(path_to_dir)
+            os.makedirs(path_to_dir, exist_ok=True)
             copy_dir(path_to_item, path_to_dir)
 
 
 def extract_title(markdown):
-    blocks = markdown.split("\n\n")
-    for block in blocks:
-        if block.strip().startswith("# "):
-            clean_block = block.replace("# ", "", 1).strip()
-            return clean_block
+    _, lines = parse_front_matter(markdown.split("\n"))
+    title, _ = split_title(iter_blocks(lines))
+    return title
+
+
+def split_title(typed_blocks, lookahead=None):
+    # the template needs the title before the content, so blocks ahead of the h1 are held back;
+    # lookahead caps how many characters of them, for callers that would rather fail than hold a page
+    typed_blocks = iter(typed_blocks)
+    buffered = []
+    size = 0
+    for block_type, block in typed_blocks:
+        buffered.append((block_type, block))
+        if block.startswith("# "):
+            return block.replace("# ", "", 1).strip(), itertools.chain(buffered, typed_blocks)
+        size += len(block)
+        if lookahead is not None and size > lookahead:
+            raise Exception(f'there is no h1 header in the first {lookahead} characters')
     raise Exception('there is no h1 header')
-        
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+
+def render_blocks(typed_blocks, basepath, cache=None):
+    if cache is None:
+        for block_type, block in typed_blocks:
+            yield rewrite_urls(block_to_html_node(block, block_type), basepath)
+        return
+
+    # cache entries keep the block's link targets in front of its html
+    for block_type, block in typed_blocks:
+        key = cache.key(block, block_type, basepath)
+        entry = cache.get(key)
+        if entry is None:
+            with collect_links() as links:
+                html = rewrite_urls(block_to_html_node(block, block_type), basepath).to_html()
+            cache.put(key, "\n".join(links) + "\0" + html)
+        else:
+            links, _, html = entry.partition("\0")
+            if links:
+                record_links(links.split("\n"))
+        yield RawNode(html)
+
+
+def template_loader(template_path, basepath, dir_path_content=None):
+    templates_dir = os.path.join(os.path.dirname(template_path), "templates")
+    return TemplateLoader(template_path, basepath, templates_dir, dir_path_content)
+
+
+def generate_page(from_path, template_path, dest_path, basepath, templates=None, cache=None, profiler=None,
+                  writer=None):
+    logger.info("Generating page from %s to %s using %s", from_path, dest_path, template_path)
+    return write_page(from_path, template_path, dest_path, basepath, templates, cache, profiler, writer)
+
+
+def write_page(from_path, template_path, dest_path, basepath, templates=None, cache=None, profiler=None,
+               writer=None):
+    if templates is None:
+        templates = template_loader(template_path, basepath)
+    if writer is None:
+        writer = OutputWriter()
+    if profiler is not None:
+        profiler.start_page(from_path)
+        try:
+            return _write_page_profiled(from_path, dest_path, basepath, templates, cache, profiler, writer)
+        finally:
+            profiler.end_page()
+
+    with open_source(from_path) as m, collect_links() as links:
+        metadata, lines = parse_front_matter(m)
+        template, dependencies = templates.for_page(from_path, metadata)
+        title, typed_blocks = split_title(iter_blocks(lines))
+        node = ParentNode("div", children=render_blocks(typed_blocks, basepath, cache))
+
+        with writer.open(dest_path) as f:
+            template.write(f, title, node)
+    return {"deps": dependencies, "links": list(dict.fromkeys(links))}
+
+
+def _write_page_profiled(from_path, dest_path, basepath, templates, cache, profiler, writer):
+    with profiler.phase("read"):
+        with open(from_path, "r") as m:
+            markdown = m.read()
+    with profiler.phase("template"):
+        metadata, lines = parse_front_matter(markdown.split("\n"))
+        template, dependencies = templates.for_page(from_path, metadata)
+    with profiler.phase("markdown_to_blocks"):
+        typed_blocks = list(iter_blocks(lines))
+    title, typed_blocks = split_title(typed_blocks)
+    with profiler.phase("block_to_html_node"), collect_links() as links:
+        node = ParentNode("div", children=list(render_blocks(typed_blocks, basepath, cache)))
+    with profiler.phase("to_html"):
+        content = node.to_html()
+    with profiler.phase("template"):
+        final_html = template.render(title, content)
+    with profiler.phase("write"):
+        writer.write(dest_path, final_html)
+    return {"deps": dependencies, "links": list(dict.fromkeys(links))}
+
+
+def render_page(from_path, lines, basepath, templates, cache=None):
+    metadata, lines = parse_front_matter(lines)
+    template, dependencies = templates.for_page(from_path, metadata)
+    title, typed_blocks = split_title(iter_blocks(lines))
+    node = ParentNode("div", children=render_blocks(typed_blocks, basepath, cache))
+    out = ChunkBuffer()
+    with collect_links() as links:
+        template.write(out, title, node)
+    return out.getchunks(), {"deps": dependencies, "links": list(dict.fromkeys(links))}
+
+
+def _read_source(from_path):
     with open(from_path, "r") as m:
-        markdown = m.read()
+        return m.read()
+
+
+async def _generate_pages_async(pages, template_path, basepath, templates, cache, writer, io_workers, queue_size):
+    loop = asyncio.get_running_loop()
+    sources = asyncio.Queue(queue_size)
+    rendered = asyncio.Queue(queue_size)
+    pending = iter(pages)
+    rendered_pages = {}
+    errors = {}
+
+    async def read():
+        # readers share one iterator, a full queue stops them from running ahead of the renderer
+        for from_path, dest_path in pending:
+            try:
+                markdown = await loop.run_in_executor(executor, _read_source, from_path)
+            except Exception as e:
+                errors[from_path] = f"{from_path}: {type(e).__name__}: {e}"
+                continue
+            await sources.put((from_path, dest_path, markdown))
+
+    async def render():
+        while (item := await sources.get()) is not None:
+            from_path, dest_path, markdown = item
+            try:
+                chunks, page = render_page(from_path, markdown.split("\n"), basepath, templates, cache)
+            except Exception as e:
+                errors[from_path] = f"{from_path}: {type(e).__name__}: {e}"
+                continue
+            await rendered.put((from_path, dest_path, chunks, page))
+            # rendering holds the loop, let finished reads and writes move on between pages
+            await asyncio.sleep(0)
 
-    with open(template_path, "r") as t:
-        template = t.read()
+    async def write():
+        while (item := await rendered.get()) is not None:
+            from_path, dest_path, chunks, page = item
+            try:
+                await loop.run_in_executor(executor, writer.write_chunks, dest_path, chunks)
+            except Exception as e:
+                errors[from_path] = f"{from_path}: {type(e).__name__}: {e}"
+                continue
+            rendered_pages[from_path] = page
+            logger.info("Generating page from %s to %s using %s", from_path, dest_path, template_path)
 
-    node = markdown_to_html_node(markdown)
-    html_text = node.to_html()
-    title = extract_title(markdown)
+    with ThreadPoolExecutor(max_workers=io_workers * 2) as executor:
+        renderer = asyncio.create_task(render())
+        writers = [asyncio.create_task(write()) for _ in range(io_workers)]
+        await asyncio.gather(*(read() for _ in range(io_workers)))
+        await sources.put(None)
+        await renderer
+        for _ in writers:
+            await rendered.put(None)
+        await asyncio.gather(*writers)
 
-    final_html = template.replace("{{ Title }}", title).replace("{{ Content }}", html_text)
-    final_html = re.sub(r'href="/', f'href="{basepath}', final_html)
-    final_html = re.sub(r'src="/', f'src="{basepath}', final_html)
-    if not os.path.exists(os.path.dirname(dest_path)):
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    if errors:
+        raise Exception("failed to generate pages:\n" + "\n".join(errors[from_path] for from_path, _ in pages
+                                                                  if from_path in errors))
+    return rendered_pages
 
-    with open(dest_path, "w") as f:
-        f.write(final_html)
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def generate_pages_async(pages, template_path, basepath, templates=None, cache=None, io_workers=8, queue_size=None,
+                         writer=None):
+    if templates is None:
+        templates = template_loader(template_path, basepath)
+    if writer is None:
+        writer = OutputWriter()
+    if queue_size is None:
+        queue_size = io_workers * 2
+    return asyncio.run(_generate_pages_async(pages, template_path, basepath, templates, cache, writer, io_workers,
+                                             queue_size))
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, jobs=1, cache=None,
+                             profiler=None, templates=None, io_workers=0, writer=None):
     os.makedirs(dest_dir_path, exist_ok=True)
+    if templates is None:
+        templates = template_loader(template_path, basepath, dir_path_content)
+    return generate_pages(find_pages(dir_path_content, dest_dir_path), template_path, basepath, jobs, cache, profiler,
+                          templates, io_workers, writer)
+
+
+_worker_templates = None
+_worker_cache = None
+_worker_profiler = None
+_worker_writer = None
+
+
+def _init_worker(templates, cache, profile, compressor):
+    global _worker_templates, _worker_cache, _worker_profiler, _worker_writer
+    _worker_templates = templates
+    _worker_cache = cache
+    _worker_writer = OutputWriter(compressor)
+    if profile:
+        _worker_profiler = BuildProfiler()
+        _worker_profiler.install()
+
+
+def _generate_page_job(job):
+    from_path, template_path, dest_path, basepath = job
+    result = {"error": None, "page": None, "hits": 0, "misses": 0, "profile": None, "written": False, "compressed": 0}
+    hits, misses = (_worker_cache.hits, _worker_cache.misses) if _worker_cache else (0, 0)
+    written = _worker_writer.written
+    compressor = _worker_writer.compressor
+    compressed = compressor.compressed if compressor else 0
+    try:
+        result["page"] = write_page(from_path, template_path, dest_path, basepath, _worker_templates, _worker_cache,
+                                    _worker_profiler, _worker_writer)
+        result["written"] = _worker_writer.written > written
+    except Exception as e:
+        result["error"] = f"{from_path}: {type(e).__name__}: {e}"
+    if _worker_cache is not None:
+        result["hits"] = _worker_cache.hits - hits
+        result["misses"] = _worker_cache.misses - misses
+    if compressor is not None:
+        result["compressed"] = compressor.compressed - compressed
+    if _worker_profiler is not None:
+        result["profile"] = _worker_profiler.pages.pop(from_path, {})
+    return result
+
+
+def generate_pages(pages, template_path, basepath, jobs=1, cache=None, profiler=None, templates=None, io_workers=0,
+                   writer=None):
+    if templates is None:
+        templates = template_loader(template_path, basepath)
+    if writer is None:
+        writer = OutputWriter()
+    if io_workers > 0 and jobs <= 1 and profiler is None and len(pages) > 1:
+        return generate_pages_async(pages, template_path, basepath, templates, cache, io_workers, writer=writer)
+    rendered_pages = {}
+    if jobs <= 1 or len(pages) < 2:
+        if profiler is not None:
+            profiler.install()
+        try:
+            for from_path, dest_path in pages:
+                rendered_pages[from_path] = generate_page(from_path, template_path, dest_path, basepath, templates,
+                                                         cache, profiler, writer)
+        finally:
+            if profiler is not None:
+                profiler.uninstall()
+        return rendered_pages
+
+    work = [(from_path, template_path, dest_path, basepath) for from_path, dest_path in pages]
+    chunksize = max(1, len(work) // (jobs * 4))
+    errors = []
+    initargs = (templates, cache, profiler is not None, writer.compressor)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+        results = pool.map(_generate_page_job, work, chunksize=chunksize)
+        for (from_path, dest_path), result in zip(pages, results):
+            if cache is not None:
+                cache.hits += result["hits"]
+                cache.misses += result["misses"]
+            if profiler is not None:
+                profiler.merge_page(from_path, result["profile"])
+            if result["error"] is not None:
+                errors.append(result["error"])
+                continue
+            rendered_pages[from_path] = result["page"]
+            writer.merge({"written": int(result["written"]), "unchanged": int(not result["written"]), "removed": 0})
+            if writer.compressor is not None:
+                writer.compressor.compressed += result["compressed"]
+            logger.info("Generating page from %s to %s using %s", from_path, dest_path, template_path)
+    if errors:
+        raise Exception("failed to generate pages:\n" + "\n".join(errors))
+    return rendered_pages
+
 
-    for item in os.listdir(dir_path_content):
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for item in sorted(os.listdir(dir_path_content)):
         path_to_item = os.path.join(dir_path_content, item)
         path_to_dest = os.path.join(dest_dir_path, item)
 
         if os.path.isfile(path_to_item) and item.endswith(".md"):
             html_name = item.replace(".md", ".html")
-            path_to_dest = os.path.join(dest_dir_path, html_name)
-            generate_page(path_to_item, template_path, path_to_dest, basepath)
+            pages.append((path_to_item, os.path.join(dest_dir_path, html_name)))
 
         elif os.path.isdir(path_to_item):
-            generate_pages_recursive(path_to_item, template_path, path_to_dest, basepath)
+            pages.extend(find_pages(path_to_item, path_to_dest))
+    return pages
+
+
+def _current_hash(path, hashes):
+    if path not in hashes:
+        hashes[path] = hash_file(path) if os.path.isfile(path) else None
+    return hashes[path]
+
+
+def _source_hash(from_path, source_hashes):
+    if source_hashes is None:
+        return hash_file(from_path)
+    stat = os.stat(from_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    known = source_hashes.get(from_path)
+    if known is None or known[0] != signature:
+        known = source_hashes[from_path] = (signature, hash_file(from_path))
+    return known[1]
+
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath, manifest_path, jobs=1,
+                               cache=None, profiler=None, templates=None, io_workers=0, writer=None,
+                               source_hashes=None):
+    old_manifest = load_manifest(manifest_path)
+    manifest = {
+        "version": GENERATOR_VERSION,
+        "basepath": hash_text(basepath),
+        "pages": {},
+    }
+    same_build = all(old_manifest.get(key) == manifest[key] for key in ("version", "basepath"))
+    old_pages = old_manifest.get("pages", {})
+    reusable_pages = old_pages if same_build else {}
+
+    if writer is None:
+        writer = OutputWriter()
+    compressor = writer.compressor
+
+    # templates, partials and absent section templates each page depended on last time
+    hashes = {}
+    stale = []
+    for from_path, dest_path in find_pages(dir_path_content, dest_dir_path):
+        entry = {"hash": _source_hash(from_path, source_hashes), "dest": dest_path}
+        old_entry = reusable_pages.get(from_path, {})
+        manifest["pages"][from_path] = entry
+        if ({"hash": old_entry.get("hash"), "dest": old_entry.get("dest")} != entry
+                or "deps" not in old_entry
+                or any(_current_hash(dep, hashes) != digest for dep, digest in old_entry["deps"].items())
+                or not os.path.exists(dest_path)
+                or compressor is not None and not compressor.is_current(dest_path)):
+            stale.append((from_path, dest_path))
+        else:
+            entry["deps"] = old_entry["deps"]
+            entry["links"] = old_entry.get("links", [])
+    if source_hashes is not None:
+        for from_path in set(source_hashes) - set(manifest["pages"]):
+            del source_hashes[from_path]
+
+    if templates is None:
+        templates = template_loader(template_path, basepath, dir_path_content)
+    rendered_pages = generate_pages(stale, template_path, basepath, jobs, cache, profiler, templates, io_workers,
+                                    writer)
+    for from_path, page in rendered_pages.items():
+        manifest["pages"][from_path].update(page)
+
+    current_outputs = {entry["dest"] for entry in manifest["pages"].values()}
+    removed = 0
+    for from_path, entry in old_pages.items():
+        if from_path in manifest["pages"] or entry["dest"] in current_outputs:
+            continue
+        writer.remove(entry["dest"], dest_dir_path)
+        removed += 1
+
+    save_manifest(manifest_path, manifest)
+    return {"generated": len(stale), "unchanged": len(manifest["pages"]) - len(stale), "removed": removed}
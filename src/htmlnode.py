@@ -1,4 +1,35 @@
+import re
+
+# only "<" and "&" can start markup in text, and only '"' and "&" can end or alter a double quoted value;
+# a bare "&" is escaped, character references already written in the markdown (&amp;, &#8212;) are kept,
+# except in code, which shows its source as written
+_REFERENCE = r'&(?!#[0-9]+;|#[xX][0-9a-fA-F]+;|[A-Za-z][A-Za-z0-9]*;)'
+_TEXT_SPECIAL = re.compile(r'<|' + _REFERENCE)
+_CODE_SPECIAL = re.compile(r'[<&]')
+_ATTR_SPECIAL = re.compile(r'"|' + _REFERENCE)
+_ENTITIES = {"&": "&amp;", "<": "&lt;", '"': "&quot;"}
+
+
+def _entity(match):
+    return _ENTITIES[match.group()]
+
+
+def escape_text(text):
+    # most text runs hold neither character, and two substring scans cost less than a regex pass
+    if "<" not in text and "&" not in text:
+        return text
+    return _TEXT_SPECIAL.sub(_entity, text)
+
+
+def escape_attr(value):
+    if '"' not in value and "&" not in value:
+        return value
+    return _ATTR_SPECIAL.sub(_entity, value)
+
+
 class HTMLNode():
+    __slots__ = ('tag', 'value', 'children', 'props')
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -6,44 +37,110 @@ class HTMLNode():
         self.props = props
 
     def to_html(self):
+        parts = []
+        self.render(parts.append)
+        return ''.join(parts)
+
+    def write_html(self, fp):
+        self.render(fp.write)
+
+    # the streaming API: write is called once per tag or text run as the tree is walked, so passing
+    # a file's write serializes a page without holding its HTML in memory
+    def render(self, write):
         raise NotImplementedError
-    
+
     def props_to_html(self):
         if self.props is None:
             return ''
-        result = ''
-        for key, val in self.props.items():
-            result += f' {key}="{val}"'
-        return result
-    
+        # escape_attr inlined, with its check for values that need nothing
+        return ''.join([f' {key}="{val}"' if '"' not in val and "&" not in val
+                        else f' {key}="{_ATTR_SPECIAL.sub(_entity, val)}"' for key, val in self.props.items()])
+
     def __repr__(self):
         return f'HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})'
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+    _special = _TEXT_SPECIAL
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, children=None, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
-    def to_html(self):
-        if self.value is None:
+    def render(self, write):
+        value = self.value
+        if value is None:
+            raise ValueError
+        # escape_text inlined: this runs once per text run of every page
+        if "<" in value or "&" in value:
+            value = self._special.sub(_entity, value)
+        if self.tag is None:
+            write(value)
+        elif self.props is None:
+            write(f'<{self.tag}>{value}</{self.tag}>')
+        else:
+            write(f'<{self.tag}{self.props_to_html()}>{value}</{self.tag}>')
+
+
+class CodeNode(LeafNode):
+    __slots__ = ()
+    _special = _CODE_SPECIAL
+
+
+class PlainLeafNode(LeafNode):
+    # a leaf whose value is known to hold no "<" or "&": text_to_children checks a whole paragraph once
+    # instead of every text run in it
+    __slots__ = ()
+
+    def render(self, write):
+        value = self.value
+        if value is None:
             raise ValueError
         if self.tag is None:
-            return self.value
+            write(value)
+        elif self.props is None:
+            write(f'<{self.tag}>{value}</{self.tag}>')
         else:
-            return f'<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>'
-            
-        
+            write(f'<{self.tag}{self.props_to_html()}>{value}</{self.tag}>')
+
+
+class RawNode(HTMLNode):
+    __slots__ = ()
+
+    def __init__(self, html):
+        self.tag = None
+        self.value = html
+        self.children = None
+        self.props = None
+
+    def render(self, write):
+        write(self.value)
+
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, value=None, children=children, props=props)
-    
-    def to_html(self):
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
+
+    def render(self, write):
+        self._check()
+        if self.props is None:
+            write(f'<{self.tag}>')
+        else:
+            write(f'<{self.tag}{self.props_to_html()}>')
+        for child in self.children:
+            child.render(write)
+        write(f'</{self.tag}>')
+
+    def _check(self):
         if self.tag is None:
             raise ValueError
         if self.children is None:
             raise ValueError('missing children')
-        child_tag_text = ''
-        for child in self.children:
-            child_tag_text += child.to_html()
-        return f'<{self.tag}{self.props_to_html()}>{child_tag_text}</{self.tag}>'
-        
\ No newline at end of file
+
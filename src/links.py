@@ -0,0 +1,37 @@
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+
+
+def is_internal(url):
+    parts = urlsplit(url)
+    return not parts.scheme and not parts.netloc and parts.path != ""
+
+
+def resolve_target(url, page_dir):
+    path = unquote(urlsplit(url).path)
+    if not path.startswith("/"):
+        path = posixpath.join("/", page_dir, path)
+    return posixpath.normpath(path).lstrip("/")
+
+
+def output_path(dest_path, dest_dir_path):
+    return os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+
+
+def check_links(index, pages, dest_dir_path, assets):
+    outputs = {from_path: output_path(dest_path, dest_dir_path) for from_path, dest_path in pages}
+    targets = set(outputs.values())
+    targets.update(assets)
+
+    broken = []
+    for from_path, links in sorted(index.items()):
+        page_dir = posixpath.dirname(outputs.get(from_path, ""))
+        for url in links:
+            if not is_internal(url):
+                continue
+            path = resolve_target(url, page_dir)
+            if path in targets or posixpath.join(path, "index.html") in targets:
+                continue
+            broken.append((from_path, url))
+    return broken
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from block import iter_blocks
+from fileio import open_source
+from frontmatter import parse_front_matter
+from htmlnode import LeafNode, ParentNode
+from manifest import load_manifest, save_manifest
+from template import rewrite_urls
+
+METADATA_VERSION = "3"
+LISTING_VERSION = "3"
+FEED_NAME = "feed.xml"
+ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+
+logger = logging.getLogger(__name__)
+
+
+def read_metadata(from_path):
+    with open_source(from_path) as m:
+        metadata, lines = parse_front_matter(m)
+        # the h1, as in the page's own <title>, so a listing never names a page differently than the page does
+        metadata.pop("title", None)
+        for _, block in iter_blocks(lines):
+            if block.startswith("# "):
+                metadata["title"] = block.replace("# ", "", 1).strip()
+                break
+    return metadata
+
+
+def page_url(dest_path, dest_dir_path):
+    path = os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if path == "index.html":
+        return "/"
+    if path.endswith("/index.html"):
+        return "/" + path[:-len("index.html")]
+    return "/" + path
+
+
+def _index_entry(cached):
+    metadata = cached["metadata"]
+    entry = dict(metadata, url=cached["url"])
+    if _timestamp(metadata.get("date", "")) is None:
+        # what the feed falls back to; only undated pages carry it, touching a dated one changes no listing
+        entry["modified"] = datetime.fromtimestamp(cached["stat"][1] // 10 ** 9, timezone.utc).isoformat()
+    return entry
+
+
+def _cache_entry(from_path, dest_path, dest_dir_path, stat, metadata=None):
+    if metadata is None:
+        metadata = read_metadata(from_path)
+    return {"stat": [stat.st_size, stat.st_mtime_ns], "metadata": metadata,
+            "url": page_url(dest_path, dest_dir_path)}
+
+
+def build_metadata_index(pages, dest_dir_path, index_path=None):
+    old_pages = {}
+    if index_path is not None:
+        old_index = load_manifest(index_path)
+        if old_index.get("version") == METADATA_VERSION:
+            old_pages = old_index.get("pages", {})
+
+    index = {}
+    cached = {}
+    for from_path, dest_path in pages:
+        stat = os.stat(from_path)
+        old = old_pages.get(from_path)
+        if old is not None and old["stat"] == [stat.st_size, stat.st_mtime_ns]:
+            cached[from_path] = _cache_entry(from_path, dest_path, dest_dir_path, stat, old["metadata"])
+        else:
+            cached[from_path] = _cache_entry(from_path, dest_path, dest_dir_path, stat)
+        index[from_path] = _index_entry(cached[from_path])
+
+    if index_path is not None:
+        save_manifest(index_path, {"version": METADATA_VERSION, "pages": cached})
+    return index
+
+
+def update_metadata_index(changed, dest_dir_path, index_path, session=None):
+    # for the watcher: only the changed pages are read again, every other entry comes from the last build.
+    # A session keeps the index in memory between calls and leaves the file as the build wrote it; its
+    # entries for the changed pages no longer match their sources and the next build reads them again
+    cached = session.get("metadata_index") if session is not None else None
+    if cached is None:
+        old_index = load_manifest(index_path)
+        if old_index.get("version") != METADATA_VERSION:
+            return None
+        cached = old_index.get("pages", {})
+    for from_path, dest_path in changed:
+        try:
+            stat = os.stat(from_path)
+        except FileNotFoundError:
+            cached.pop(from_path, None)
+            continue
+        cached[from_path] = _cache_entry(from_path, dest_path, dest_dir_path, stat)
+    if session is not None:
+        session["metadata_index"] = cached
+    else:
+        save_manifest(index_path, {"version": METADATA_VERSION, "pages": cached})
+    return cached
+
+
+def listing_dir(from_path, dir_path_content):
+    # a page is listed by the directory above it, unless that directory has an index.md of its own
+    rel_path = os.path.relpath(from_path, dir_path_content)
+    directory = os.path.dirname(rel_path)
+    if os.path.basename(rel_path) == "index.md":
+        if not directory:
+            return None
+        directory = os.path.dirname(directory)
+    if os.path.exists(os.path.join(dir_path_content, directory, "index.md")):
+        return None
+    return directory
+
+
+def find_listings(dir_path_content, index):
+    listings = {}
+    for from_path in index:
+        directory = listing_dir(from_path, dir_path_content)
+        if directory is not None:
+            listings.setdefault(directory, []).append(from_path)
+    for directory, members in listings.items():
+        members.sort(key=lambda from_path: index[from_path].get("title", ""))
+        members.sort(key=lambda from_path: index[from_path].get("date", ""), reverse=True)
+    return listings
+
+
+def listing_title(directory):
+    name = os.path.basename(directory) or "Index"
+    return name.replace("-", " ").replace("_", " ").title()
+
+
+def listing_node(title, entries, feed_url):
+    items = []
+    for entry in entries:
+        children = [LeafNode("a", entry.get("title", entry["url"]), {"href": entry["url"]})]
+        if entry.get("date"):
+            children.append(LeafNode("time", entry["date"], {"datetime": entry["date"]}))
+        items.append(ParentNode("li", children))
+    children = [LeafNode("h1", title)]
+    if items:
+        children.append(ParentNode("ul", items))
+    if feed_url is not None:
+        children.append(ParentNode("p", [LeafNode("a", "Atom feed", {"href": feed_url})]))
+    return ParentNode("div", children)
+
+
+def _timestamp(date):
+    try:
+        parsed = datetime.fromisoformat(date)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.isoformat()
+
+
+def render_feed(title, entries, feed_url, site_url):
+    ET.register_namespace("", ATOM_NAMESPACE)
+    feed = ET.Element(f"{{{ATOM_NAMESPACE}}}feed")
+
+    def child(parent, tag, text=None, **attrs):
+        element = ET.SubElement(parent, f"{{{ATOM_NAMESPACE}}}{tag}", attrs)
+        element.text = text
+        return element
+
+    # entries without a usable date fall back to their source's mtime, the epoch only when that is unknown
+    epoch = datetime.fromtimestamp(0, timezone.utc).isoformat()
+    updated = [_timestamp(entry.get("date", "")) or entry.get("modified") or epoch for entry in entries]
+    child(feed, "title", title)
+    child(feed, "id", site_url + feed_url)
+    child(feed, "updated", max(updated, default=epoch))
+    child(feed, "link", rel="self", href=site_url + feed_url)
+    for entry, entry_updated in zip(entries, updated):
+        item = child(feed, "entry")
+        child(item, "title", entry.get("title", entry["url"]))
+        child(item, "id", site_url + entry["url"])
+        child(item, "link", href=site_url + entry["url"])
+        child(item, "updated", entry_updated)
+        if entry.get("description"):
+            child(item, "summary", entry["description"])
+    return '<?xml version="1.0" encoding="utf-8"?>\n' + ET.tostring(feed, encoding="unicode") + "\n"
+
+
+def generate_listings(dir_path_content, dest_dir_path, basepath, index, templates, writer, state_path=None,
+                      site_url="", directories=None):
+    old_state = load_manifest(state_path) if state_path is not None else {}
+    state = {}
+    outputs = []
+    generated = 0
+    site_url = site_url.rstrip("/")
+    listings = find_listings(dir_path_content, index)
+    if directories is not None:
+        # only these listings are refreshed, the others keep their state from the last build
+        listings = {directory: members for directory, members in listings.items() if directory in directories}
+        refreshed = {os.path.join(dest_dir_path, directory, "index.html") for directory in directories}
+        state = {dest_path: entry for dest_path, entry in old_state.items() if dest_path not in refreshed}
+    # Atom ids and links must be absolute, without a site URL to resolve them against no feeds are written
+    url = urlsplit(site_url)
+    feeds = bool(url.scheme and url.netloc)
+    if listings and not feeds:
+        if site_url:
+            logger.warning("site URL %s is not absolute, skipping Atom feeds", site_url)
+        else:
+            logger.info("no site URL given, skipping Atom feeds")
+    for directory, members in sorted(listings.items()):
+        dest_path = os.path.join(dest_dir_path, directory, "index.html")
+        feed_path = os.path.join(dest_dir_path, directory, FEED_NAME) if feeds else None
+        outputs.extend(path for path in [dest_path, feed_path] if path is not None)
+
+        title = listing_title(directory)
+        entries = [index[from_path] for from_path in members]
+        signature = hashlib.sha256(json.dumps([LISTING_VERSION, basepath, site_url, title, entries]).encode("utf-8")).hexdigest()
+        template, dependencies = templates.for_page(os.path.join(dir_path_content, directory, "index.md"))
+        entry = {"hash": signature, "deps": dependencies}
+        state[dest_path] = entry
+        if (old_state.get(dest_path) == entry and os.path.exists(dest_path)
+                and (feed_path is None or os.path.exists(feed_path))):
+            continue
+
+        feed_url = page_url(feed_path, dest_dir_path) if feeds else None
+        node = rewrite_urls(listing_node(title, entries, feed_url), basepath)
+        writer.write(dest_path, template.render(title, node.to_html()))
+        if feeds:
+            feed_base = site_url + basepath.rstrip("/")
+            writer.write(feed_path, render_feed(title, entries, feed_url, feed_base))
+        generated += 1
+
+    if state_path is not None:
+        save_manifest(state_path, state)
+    return {"generated": generated, "unchanged": len(state) - generated, "outputs": outputs}
+
+
+def refresh_listings(changed, dir_path_content, dest_dir_path, basepath, templates, writer, index_path,
+                     state_path=None, site_url="", session=None):
+    # changed holds (from_path, dest_path) of edited pages; only the listings they belong to are rebuilt,
+    # from the metadata index of the last build. None when there is no usable index and a build is needed
+    directories = {listing_dir(from_path, dir_path_content) for from_path, _ in changed} - {None}
+    cached = update_metadata_index(changed, dest_dir_path, index_path, session)
+    if cached is None:
+        return None
+    prefixes = tuple(os.path.join(dir_path_content, directory, "") for directory in directories)
+    index = {from_path: _index_entry(entry) for from_path, entry in cached.items() if from_path.startswith(prefixes)}
+    return generate_listings(dir_path_content, dest_dir_path, basepath, index, templates, writer, state_path,
+                             site_url, directories)
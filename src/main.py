@@ -1,27 +1,306 @@
+import argparse
+import contextlib
+import logging
 import os
-import shutil
 import sys
-from generator import copy_dir, generate_pages_recursive
+from assets import scan_files, sync_dir
+from client import SOCKET_PATH
+from compress import MIN_SIZE, Compressor
+from daemon import BuildServer
+from generator import find_pages, generate_pages_recursive, generate_pages_incremental, template_loader
+from links import check_links
+from listing import build_metadata_index, generate_listings
+from manifest import load_manifest, save_manifest
+from output import OutputWriter
+from profiler import BuildProfiler, format_summary
+from render_cache import RenderCache
+from shard import SHARD_ROOT, build_shard, merge_shards, parse_shard
+from watcher import apply_changes, create_watcher, serve
 
-def main():
+MANIFEST_PATH = '.cache/manifest.json'
+ASSET_MANIFEST_PATH = '.cache/assets.json'
+RENDER_CACHE_DIR = '.cache/render'
+PROFILE_PATH = '.cache/profile.json'
+LINK_INDEX_PATH = '.cache/links.json'
+METADATA_INDEX_PATH = '.cache/metadata.json'
+LISTINGS_PATH = '.cache/listings.json'
+TEMPLATES_DIR = 'templates/'
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/")
+    parser.add_argument('basepath', nargs='?', default='/')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only regenerate pages whose inputs changed since the last build")
+    parser.add_argument('--hash-assets', action='store_true',
+                        help="compare static files with their copies by content hash instead of size and mtime")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="render pages in a pool of N worker processes")
+    parser.add_argument('--io-workers', type=int, default=0, metavar='N',
+                        help="overlap reading, rendering and writing pages with N concurrent file operations")
+    parser.add_argument('--compress', action='store_true',
+                        help="write pre-compressed siblings (.gz, and .br/.zst when available) of text outputs")
+    parser.add_argument('--compress-formats', metavar='LIST',
+                        help="comma separated subset of gz, br and zst to write with --compress")
+    parser.add_argument('--compress-min-size', type=int, default=MIN_SIZE, metavar='BYTES',
+                        help="leave files smaller than this uncompressed")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse rendered HTML of identical blocks, kept in .cache/render between builds")
+    parser.add_argument('--cache-size', type=int, default=512, metavar='MB',
+                        help="on-disk size limit of the render cache")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_PATH, metavar='PATH',
+                        help=f"record per-phase timings and write a JSON report (default {PROFILE_PATH})")
+    parser.add_argument('--top', type=int, default=10, metavar='N',
+                        help="number of slowest pages listed in the profile summary")
+    parser.add_argument('--site-url', default='', metavar='URL',
+                        help="absolute site address for the Atom feeds, which are only written when it is given")
+    parser.add_argument('--strict-links', action='store_true',
+                        help="fail the build when a link or image points at a missing page or asset")
+    parser.add_argument('--shard', type=shard_arg, metavar='I/N',
+                        help="render only the I-th of N deterministic slices of the pages, for a later merge")
+    parser.add_argument('--shard-root', default=SHARD_ROOT, metavar='DIR',
+                        help=f"with --shard, render into DIR/I-of-N (default {SHARD_ROOT})")
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="only log warnings and errors")
+    args = parser.parse_args(argv)
+    if args.shard is not None and (args.incremental or args.compress):
+        parser.error("--shard renders pages only; compression and pruning happen in merge")
+    return args
+
+
+def shard_arg(text):
     try:
-        basepath = sys.argv[1]
-    except IndexError:
-        basepath = '/'
-    
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main(argv=None, session=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    basepath = args.basepath
+    setup_logging(args.quiet)
+    profiler = BuildProfiler() if args.profile else None
+
     if not os.path.exists('static/'):
         raise Exception("not valid path")
-    if os.path.exists('docs/'):
-        shutil.rmtree('docs/')
+    dir_path_content = 'content/'
+    template_path = 'template.html'
+    dest_dir_path = 'docs/'
+    cache = open_cache(args, session)
+    templates = open_templates(template_path, basepath, dir_path_content, session)
+    if args.shard is not None:
+        index, count = args.shard
+        stats = build_shard(dir_path_content, template_path, args.shard_root, basepath, index, count,
+                            jobs=args.jobs, cache=cache, profiler=profiler, templates=templates,
+                            io_workers=args.io_workers)
+        logger.info("shard %d/%d: %d pages rendered into %s", index, count, stats['pages'], stats['out_dir'])
+        finish(cache, profiler, args)
+        return stats
+
+    compressor = None
+    if args.compress:
+        formats = args.compress_formats.split(',') if args.compress_formats else None
+        compressor = Compressor(formats, args.compress_min_size)
+
     os.makedirs('docs', exist_ok=True)
-    copy_dir('static/', 'docs/')
+    with profiler.phase("assets") if profiler else contextlib.nullcontext():
+        stats = sync_dir('static/', 'docs/', ASSET_MANIFEST_PATH, use_hash=args.hash_assets, compressor=compressor)
+        logger.info("%d assets copied, %d unchanged, %d removed", stats['copied'], stats['unchanged'], stats['removed'])
+
+    writer = OutputWriter(compressor)
+    if args.incremental:
+        stats = generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath, MANIFEST_PATH,
+                                           jobs=args.jobs, cache=cache, profiler=profiler, templates=templates,
+                                           io_workers=args.io_workers, writer=writer,
+                                           source_hashes=session.setdefault('source_hashes', {}) if session else None)
+        logger.info("%d generated, %d unchanged, %d removed", stats['generated'], stats['unchanged'], stats['removed'])
+        manifest_pages = load_manifest(MANIFEST_PATH)['pages']
+        link_index = {from_path: entry['links'] for from_path, entry in manifest_pages.items()}
+    else:
+        rendered_pages = generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath,
+                                                  jobs=args.jobs, cache=cache, profiler=profiler,
+                                                  templates=templates, io_workers=args.io_workers, writer=writer)
+        link_index = {from_path: page['links'] for from_path, page in rendered_pages.items()}
+
+    pages = find_pages(dir_path_content, dest_dir_path)
+    result = assemble(pages, link_index, basepath, templates, writer, profiler, args)
+    finish(cache, profiler, args)
+    return result
+
+
+def open_cache(args, session=None):
+    if not args.cache:
+        return None
+    max_disk_bytes = args.cache_size * 1024 * 1024
+    cache = session.get('cache') if session is not None else None
+    if cache is None or cache.max_disk_bytes != max_disk_bytes:
+        cache = RenderCache(RENDER_CACHE_DIR, max_disk_bytes=max_disk_bytes)
+    else:
+        cache.hits = cache.misses = 0
+    if session is not None:
+        session['cache'] = cache
+    return cache
+
+
+def open_templates(template_path, basepath, dir_path_content, session=None):
+    templates = session.get('templates') if session is not None else None
+    if templates is None or templates.basepath != basepath:
+        templates = template_loader(template_path, basepath, dir_path_content)
+    else:
+        templates.refresh()
+    if session is not None:
+        session['templates'] = templates
+    return templates
+
+
+def setup_logging(quiet):
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger().setLevel(logging.WARNING if quiet else logging.INFO)
+
 
+def assemble(pages, link_index, basepath, templates, writer, profiler, args):
     dir_path_content = 'content/'
-    template_path = 'template.html'
     dest_dir_path = 'docs/'
-    generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath)
-        
-main()
+    incremental = getattr(args, 'incremental', False)
+    with profiler.phase("listings") if profiler else contextlib.nullcontext():
+        metadata_index = build_metadata_index(pages, dest_dir_path, METADATA_INDEX_PATH)
+        listings = generate_listings(dir_path_content, dest_dir_path, basepath, metadata_index, templates, writer,
+                                     LISTINGS_PATH if incremental else None, args.site_url)
+    logger.info("%d listing pages generated, %d unchanged", listings['generated'], listings['unchanged'])
+
+    assets = set(scan_files('static/'))
+    assets.update(os.path.relpath(dest_path, dest_dir_path) for dest_path in listings['outputs'])
+    if not incremental:
+        # whatever is neither a page, a listing nor an asset is left over from an earlier build
+        keep = [dest_path for _, dest_path in pages]
+        keep.extend(os.path.join(dest_dir_path, rel_path) for rel_path in assets)
+        writer.prune(dest_dir_path, keep)
+    logger.info("output: %d written, %d unchanged, %d removed", writer.written, writer.unchanged, writer.removed)
+    compressor = writer.compressor
+    if compressor is not None:
+        with profiler.phase("compress") if profiler else contextlib.nullcontext():
+            compressor.close()
+        logger.info("compressed %d files to %s", compressor.compressed, ", ".join(compressor.suffixes()))
+
+    save_manifest(LINK_INDEX_PATH, {"links": link_index})
+    broken = check_links(link_index, pages, dest_dir_path, assets)
+    for from_path, url in broken:
+        logger.warning("broken link in %s: %s", from_path, url)
+    if broken and args.strict_links:
+        raise Exception(f"{len(broken)} broken links")
+    return dict(writer.stats(), pages=len(pages), listings=listings['generated'] + listings['unchanged'],
+                broken_links=[list(link) for link in broken])
+
+
+def finish(cache, profiler, args):
+    if cache is not None:
+        cache.prune()
+        logger.info("render cache: %d hits, %d misses", cache.hits, cache.misses)
+    if profiler is not None:
+        report = profiler.save(args.profile, args.top)
+        logger.info("%s\nprofile written to %s", format_summary(report), args.profile)
+
+
+def merge(argv=None):
+    parser = argparse.ArgumentParser(description="Assemble docs/ from the outputs of sharded builds")
+    parser.add_argument('--shard-root', default=SHARD_ROOT, metavar='DIR',
+                        help=f"directory the shards were rendered into (default {SHARD_ROOT})")
+    parser.add_argument('--compress', action='store_true',
+                        help="write pre-compressed siblings (.gz, and .br/.zst when available) of text outputs")
+    parser.add_argument('--compress-formats', metavar='LIST',
+                        help="comma separated subset of gz, br and zst to write with --compress")
+    parser.add_argument('--compress-min-size', type=int, default=MIN_SIZE, metavar='BYTES',
+                        help="leave files smaller than this uncompressed")
+    parser.add_argument('--site-url', default='', metavar='URL',
+                        help="absolute site address for the Atom feeds, which are only written when it is given")
+    parser.add_argument('--strict-links', action='store_true',
+                        help="fail the build when a link or image points at a missing page or asset")
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="only log warnings and errors")
+    args = parser.parse_args(sys.argv[2:] if argv is None else argv)
+    args.profile = None
+    setup_logging(args.quiet)
+
+    if not os.path.exists('static/'):
+        raise Exception("not valid path")
+    compressor = None
+    if args.compress:
+        formats = args.compress_formats.split(',') if args.compress_formats else None
+        compressor = Compressor(formats, args.compress_min_size)
+    writer = OutputWriter(compressor)
+    merged = merge_shards(args.shard_root, 'docs/', writer, assets=scan_files('static/'))
+    logger.info("%d pages merged from %d shards", len(merged['pages']), merged['shards'])
+    # static assets are copied once here rather than by every shard
+    stats = sync_dir('static/', 'docs/', ASSET_MANIFEST_PATH, compressor=compressor)
+    logger.info("%d assets copied, %d unchanged, %d removed", stats['copied'], stats['unchanged'], stats['removed'])
+
+    templates = template_loader('template.html', merged['basepath'], 'content/')
+    return assemble(merged['pages'], merged['links'], merged['basepath'], templates, writer, None, args)
+
+
+def watch(argv=None):
+    parser = argparse.ArgumentParser(description="Build the site, serve docs/ and rebuild on changes")
+    parser.add_argument('basepath', nargs='?', default='/')
+    parser.add_argument('--port', type=int, default=8888)
+    args = parser.parse_args(sys.argv[2:] if argv is None else argv)
+
+    # the session keeps the source hashes and templates of one build for the next
+    session = {}
+    main(['--incremental', args.basepath], session)
+    server = serve('docs/', args.port)
+    roots = ['content/', 'static/', 'template.html']
+    if os.path.isdir(TEMPLATES_DIR):
+        roots.append(TEMPLATES_DIR)
+    watcher = create_watcher(roots)
+    templates = template_loader('template.html', args.basepath, 'content/')
+    logger.info("Serving docs/ on http://localhost:%d/ and watching for changes", args.port)
+    try:
+        while True:
+            changed = watcher.wait()
+            if not changed:
+                continue
+            if apply_changes(changed, 'content/', 'static/', 'template.html', 'docs/', args.basepath, templates,
+                             METADATA_INDEX_PATH, LISTINGS_PATH, session=session):
+                main(['--incremental', args.basepath], session)
+                # the build wrote a fresh metadata index, the watcher's copy may lack new pages
+                session.pop('metadata_index', None)
+                templates = template_loader('template.html', args.basepath, 'content/')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        server.shutdown()
+
+
+def run_build(argv, session):
+    if argv[:1] == ['merge']:
+        return merge(argv[1:])
+    return main(argv, session)
+
+
+def daemon(argv=None):
+    parser = argparse.ArgumentParser(description="Serve builds requested by src/client.py from a warm process")
+    parser.add_argument('--socket', default=SOCKET_PATH, metavar='PATH',
+                        help=f"Unix socket to listen on (default {SOCKET_PATH})")
+    args = parser.parse_args(sys.argv[2:] if argv is None else argv)
+    setup_logging(False)
+
+    server = BuildServer(args.socket, run_build)
+    logger.info("Listening for builds on %s", args.socket)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if sys.argv[1:2] == ['watch']:
+        watch()
+    elif sys.argv[1:2] == ['merge']:
+        merge()
+    elif sys.argv[1:2] == ['daemon']:
+        daemon()
+    else:
+        main()
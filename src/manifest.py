@@ -0,0 +1,43 @@
+import hashlib
+import json
+import os
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text):
+    return hash_bytes(text.encode("utf-8"))
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    return manifest
+
+
+def save_manifest(path, manifest):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    # json.dumps without indent runs the C encoder, json.dump and indent fall back to the pure Python one
+    with open(tmp_path, "w") as f:
+        f.write(json.dumps(manifest, sort_keys=True))
+    os.replace(tmp_path, path)
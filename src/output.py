@@ -0,0 +1,236 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from fileio import ChunkWriter, chunks_size, hash_chunks, write_chunks
+from manifest import hash_file
+
+COMPRESSED_SUFFIXES = (".gz", ".br", ".zst")
+COPY_SIZE = 1 << 16
+
+
+def temp_file(path):
+    # created next to path so os.replace stays on one filesystem
+    directory = os.path.dirname(path)
+    os.makedirs(directory or ".", exist_ok=True)
+    return tempfile.mkstemp(dir=directory or ".", prefix="." + os.path.basename(path), suffix=".tmp")
+
+
+def atomic_write(path, data, mtime_ns=None):
+    chunks = [data] if isinstance(data, bytes) else data
+    fd, tmp_path = temp_file(path)
+    try:
+        try:
+            write_chunks(fd, chunks)
+        finally:
+            os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        if mtime_ns is not None:
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_file(path, mtime_ns=None):
+    # like atomic_write for output produced a piece at a time: a binary file to write to, renamed into place
+    fd, tmp_path = temp_file(path)
+    try:
+        with open(fd, "wb") as f:
+            yield f
+        os.chmod(tmp_path, 0o644)
+        if mtime_ns is not None:
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def remove_siblings(dest_path):
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(dest_path + suffix):
+            os.remove(dest_path + suffix)
+
+
+def remove_output(dest_path, dest_dir_path):
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    remove_siblings(dest_path)
+    directory = os.path.dirname(dest_path)
+    root = os.path.normpath(dest_dir_path)
+    while os.path.normpath(directory) != root and os.path.isdir(directory):
+        if os.listdir(directory):
+            break
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def prune_outputs(dest_dir_path, keep):
+    keep = {os.path.normpath(path) for path in keep}
+    removed = 0
+    for root, _, files in os.walk(dest_dir_path, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.normpath(path) not in keep and os.path.exists(path):
+                remove_output(path, dest_dir_path)
+                removed += 1
+    return removed
+
+
+class OutputWriter():
+    def __init__(self, compressor=None):
+        self.compressor = compressor
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.lock = threading.Lock()
+
+    def matches(self, dest_path, size, digest):
+        try:
+            return os.path.getsize(dest_path) == size and hash_file(dest_path) == digest
+        except OSError:
+            return False
+
+    def is_current(self, dest_path, chunks):
+        return self.matches(dest_path, chunks_size(chunks), hash_chunks(chunks))
+
+    def write(self, dest_path, text):
+        return self.write_chunks(dest_path, [text.encode("utf-8")])
+
+    def write_chunks(self, dest_path, chunks):
+        if self.is_current(dest_path, chunks):
+            with self.lock:
+                self.unchanged += 1
+            if self.compressor is not None and not self.compressor.is_current(dest_path):
+                self.compressor.submit(dest_path)
+            return False
+
+        atomic_write(dest_path, chunks)
+        with self.lock:
+            self.written += 1
+        if self.compressor is not None:
+            self.compressor.submit(dest_path, chunks)
+        return True
+
+    @contextmanager
+    def open(self, dest_path):
+        # the page streams out in chunks that are compared with the file already at dest_path as they come, so
+        # it is never held in memory whole and an unchanged page is neither written again nor hashed
+        output = _StreamedOutput(dest_path, self.compressor)
+        try:
+            out = ChunkWriter(output.write)
+            yield out
+            out.flush()
+            changed = output.close()
+        except BaseException:
+            output.abort()
+            raise
+
+        with self.lock:
+            if changed:
+                self.written += 1
+            else:
+                self.unchanged += 1
+        if not changed and self.compressor is not None and not self.compressor.is_current(dest_path):
+            self.compressor.submit(dest_path)
+
+    def remove(self, dest_path, dest_dir_path):
+        remove_output(dest_path, dest_dir_path)
+        with self.lock:
+            self.removed += 1
+
+    def prune(self, dest_dir_path, keep):
+        keep = list(keep)
+        if self.compressor is not None:
+            # compressed siblings are only kept for files that still want them
+            keep += [sibling for path in keep for sibling in self.compressor.siblings(path)]
+        removed = prune_outputs(dest_dir_path, keep)
+        with self.lock:
+            self.removed += removed
+        return removed
+
+    def merge(self, stats):
+        with self.lock:
+            self.written += stats["written"]
+            self.unchanged += stats["unchanged"]
+            self.removed += stats["removed"]
+
+    def stats(self):
+        return {"written": self.written, "unchanged": self.unchanged, "removed": self.removed}
+
+
+class _StreamedOutput():
+    # chunks that match the old file are only read, a temp file is started at the first difference or once the
+    # page runs past the old file's end, and the matched prefix is copied into it from the old file. Compressed
+    # siblings are fed the same bytes from then on, an unchanged page costs no compression either
+    def __init__(self, dest_path, compressor):
+        self.dest_path = dest_path
+        self.compressor = compressor
+        try:
+            self.old = open(dest_path, "rb")
+        except OSError:
+            self.old = None
+        self.matched = 0
+        self.fd = None
+        self.tmp_path = None
+        self.stream = None
+
+    def write(self, chunks):
+        if self.fd is None and self.old is not None:
+            for i, chunk in enumerate(chunks):
+                if self.old.read(len(chunk)) != chunk:
+                    chunks = chunks[i:]
+                    break
+                self.matched += len(chunk)
+            else:
+                return
+        if self.fd is None:
+            self._start()
+        write_chunks(self.fd, chunks)
+        if self.stream is not None:
+            self.stream.write(chunks)
+
+    def _start(self):
+        self.fd, self.tmp_path = temp_file(self.dest_path)
+        if self.compressor is not None:
+            self.stream = self.compressor.stream(self.dest_path)
+        if self.old is None:
+            return
+        self.old.seek(0)
+        remaining = self.matched
+        while remaining:
+            data = self.old.read(min(remaining, COPY_SIZE))
+            write_chunks(self.fd, [data])
+            if self.stream is not None:
+                self.stream.write([data])
+            remaining -= len(data)
+        self.old.close()
+        self.old = None
+
+    def close(self):
+        # the old file is unchanged when every chunk matched and nothing of it is left over
+        if self.fd is None and (self.old is None or self.old.read(1)):
+            self._start()
+        if self.fd is None:
+            self.old.close()
+            return False
+        os.close(self.fd)
+        self.fd = None
+        os.chmod(self.tmp_path, 0o644)
+        os.replace(self.tmp_path, self.dest_path)
+        if self.stream is not None:
+            self.stream.close(os.stat(self.dest_path).st_mtime_ns)
+        return True
+
+    def abort(self):
+        if self.old is not None:
+            self.old.close()
+        if self.fd is not None:
+            os.close(self.fd)
+            os.unlink(self.tmp_path)
+        if self.stream is not None:
+            self.stream.abort()
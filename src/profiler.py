@@ -0,0 +1,111 @@
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import block
+
+
+class BuildProfiler():
+    def __init__(self):
+        self.pages = {}
+        self.build = {}
+        self.current = self.build
+        self.stack = []
+        self.originals = None
+
+    def start_page(self, page):
+        self.current = self.pages.setdefault(page, {})
+
+    def end_page(self):
+        self.current = self.build
+
+    @contextmanager
+    def phase(self, name):
+        self.stack.append([0.0, 0.0])
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            child_wall, child_cpu = self.stack.pop()
+            if self.stack:
+                self.stack[-1][0] += wall
+                self.stack[-1][1] += cpu
+            totals = self.current.setdefault(name, [0.0, 0.0])
+            totals[0] += wall - child_wall
+            totals[1] += cpu - child_cpu
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def install(self):
+        self.originals = (block.block_to_block_type, block.text_to_textnodes)
+        block.block_to_block_type = self.wrap("block_to_block_type", self.originals[0])
+        block.text_to_textnodes = self.wrap("text_to_textnodes", self.originals[1])
+
+    def uninstall(self):
+        block.block_to_block_type, block.text_to_textnodes = self.originals
+
+    @contextmanager
+    def instrument(self):
+        self.install()
+        try:
+            yield self
+        finally:
+            self.uninstall()
+
+    def merge_page(self, page, phases):
+        self.pages[page] = phases
+
+    def report(self, top=10):
+        totals = {}
+        for phases in self.pages.values():
+            for name, (wall, cpu) in phases.items():
+                total = totals.setdefault(name, [0.0, 0.0])
+                total[0] += wall
+                total[1] += cpu
+        pages = {page: _phase_dict(phases) for page, phases in self.pages.items()}
+        slowest = sorted(pages, key=lambda page: pages[page]["total"]["wall"], reverse=True)[:top]
+        return {
+            "build": _phase_dict(self.build),
+            "phases": _phase_dict(totals),
+            "pages": pages,
+            "slowest": [{"page": page, "wall": pages[page]["total"]["wall"]} for page in slowest],
+        }
+
+    def save(self, path, top=10):
+        report = self.report(top)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+        return report
+
+
+def _phase_dict(phases):
+    result = {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in phases.items()}
+    result["total"] = {"wall": sum(wall for wall, _ in phases.values()),
+                       "cpu": sum(cpu for _, cpu in phases.values())}
+    return result
+
+
+def format_summary(report):
+    lines = ["phase                    wall ms     cpu ms"]
+    for name, times in report["phases"].items():
+        lines.append(f"{name:<22}{times['wall'] * 1000:>10.2f}{times['cpu'] * 1000:>11.2f}")
+    for name, times in report["build"].items():
+        if name != "total":
+            lines.append(f"{name:<22}{times['wall'] * 1000:>10.2f}{times['cpu'] * 1000:>11.2f}")
+    lines.append(f"slowest {len(report['slowest'])} pages:")
+    for entry in report["slowest"]:
+        lines.append(f"{entry['wall'] * 1000:>10.2f} ms  {entry['page']}")
+    return "\n".join(lines)
@@ -0,0 +1,99 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+CACHE_VERSION = "6"
+
+
+class RenderCache():
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, block, block_type, basepath):
+        text = f"{CACHE_VERSION}\0{block_type.value}\0{basepath}\0{block}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+        html = self._read(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, html)
+        return html
+
+    def put(self, key, html):
+        self._remember(key, html)
+        self._write(key, html)
+
+    def _remember(self, key, html):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.entries[key] = html
+        self.size += len(html)
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return html
+
+    def _write(self, key, html):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        if self.directory is None or not os.path.isdir(self.directory):
+            return 0
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                stat = item.stat()
+                files.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+        removed = 0
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def __repr__(self):
+        return f'RenderCache({self.directory}, {self.hits} hits, {self.misses} misses)'
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+import shutil
+
+from generator import find_pages, generate_pages
+from links import output_path
+from manifest import hash_bytes, hash_file, load_manifest, save_manifest
+from output import OutputWriter
+
+SHARD_VERSION = "1"
+SHARD_ROOT = ".cache/shards"
+SHARD_MANIFEST = "shard.json"
+
+
+def parse_shard(text):
+    match = re.fullmatch(r"(\d+)/(\d+)", text.strip())
+    if match is None:
+        raise ValueError(f"shard must look like i/N, got {text!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def shard_of(rel_path, count):
+    # hash() of a str is salted per process, so every shard would disagree about the split
+    digest = hashlib.sha1(rel_path.replace(os.sep, "/").encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(pages, dir_path_content, index, count):
+    return [(from_path, dest_path) for from_path, dest_path in pages
+            if shard_of(os.path.relpath(from_path, dir_path_content), count) == index]
+
+
+def shard_dir(shard_root, index, count):
+    return os.path.join(shard_root, f"{index}-of-{count}")
+
+
+def build_shard(dir_path_content, template_path, shard_root, basepath, index, count, jobs=1, cache=None,
+                profiler=None, templates=None, io_workers=0, writer=None):
+    out_dir = shard_dir(shard_root, index, count)
+    os.makedirs(out_dir, exist_ok=True)
+    # shards of an earlier build split another way would otherwise be picked up by the merge; the other
+    # shards of this build may be removing them at the same time
+    for name in os.listdir(shard_root):
+        match = re.fullmatch(r"\d+-of-(\d+)", name)
+        if match is not None and int(match.group(1)) != count:
+            shutil.rmtree(os.path.join(shard_root, name), ignore_errors=True)
+    if writer is None:
+        writer = OutputWriter()
+    pages = select_shard(find_pages(dir_path_content, out_dir), dir_path_content, index, count)
+    rendered_pages = generate_pages(pages, template_path, basepath, jobs, cache, profiler, templates, io_workers,
+                                    writer)
+
+    entries = {}
+    for from_path, dest_path in pages:
+        entries[from_path] = {"dest": output_path(dest_path, out_dir), "hash": hash_file(dest_path),
+                              "links": rendered_pages[from_path]["links"]}
+    manifest_path = os.path.join(out_dir, SHARD_MANIFEST)
+    # a rerun of the same shard may have lost pages to another shard or to a deleted source
+    writer.prune(out_dir, [dest_path for _, dest_path in pages] + [manifest_path])
+    save_manifest(manifest_path, {"version": SHARD_VERSION, "index": index, "count": count, "basepath": basepath,
+                                  "pages": entries})
+    return {"pages": len(pages), "out_dir": out_dir}
+
+
+def load_shards(shard_root):
+    shards = []
+    for name in sorted(os.listdir(shard_root)):
+        manifest = load_manifest(os.path.join(shard_root, name, SHARD_MANIFEST))
+        if manifest:
+            shards.append((os.path.join(shard_root, name), manifest))
+    if not shards:
+        raise Exception(f"no shards found in {shard_root}")
+
+    first = shards[0][1]
+    for out_dir, manifest in shards:
+        for key in ("version", "count", "basepath"):
+            if manifest.get(key) != first.get(key):
+                raise Exception(f"{out_dir} was built with a different {key} than {shards[0][0]}")
+    if first.get("version") != SHARD_VERSION:
+        raise Exception(f"shards in {shard_root} were built by another generator version")
+    missing = set(range(1, first["count"] + 1)) - {manifest["index"] for _, manifest in shards}
+    if missing:
+        raise Exception(f"missing shards {', '.join(map(str, sorted(missing)))} of {first['count']} in {shard_root}")
+    return shards
+
+
+def merge_shards(shard_root, dest_dir_path, writer=None, assets=()):
+    shards = load_shards(shard_root)
+    if writer is None:
+        writer = OutputWriter()
+
+    # collect every output first so a collision fails the merge before docs/ is touched
+    owners = {rel_path: "static asset" for rel_path in assets}
+    outputs = []
+    collisions = []
+    for out_dir, manifest in shards:
+        for from_path, entry in sorted(manifest["pages"].items()):
+            rel_path = entry["dest"]
+            if rel_path in owners:
+                collisions.append(f"{rel_path}: {owners[rel_path]} and {from_path}")
+                continue
+            owners[rel_path] = from_path
+            outputs.append((out_dir, from_path, entry))
+    if collisions:
+        raise Exception("colliding shard outputs:\n" + "\n".join(collisions))
+
+    pages = []
+    link_index = {}
+    for out_dir, from_path, entry in outputs:
+        source = os.path.join(out_dir, entry["dest"])
+        with open(source, "rb") as f:
+            data = f.read()
+        if hash_bytes(data) != entry["hash"]:
+            raise Exception(f"{source} changed after its shard was built")
+        dest_path = os.path.join(dest_dir_path, entry["dest"])
+        writer.write_chunks(dest_path, [data])
+        pages.append((from_path, dest_path))
+        link_index[from_path] = entry["links"]
+    return {"basepath": shards[0][1]["basepath"], "shards": len(shards), "pages": pages, "links": link_index}
@@ -0,0 +1,126 @@
+import os
+import re
+
+from htmlnode import escape_text
+from manifest import hash_file
+
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+INCLUDE_PATTERN = re.compile(r"\{\{ include ([\w./-]+) \}\}")
+
+
+def rewrite_basepath(html, basepath):
+    if basepath == "/":
+        return html
+    return html.replace('href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
+
+
+def rewrite_urls(node, basepath):
+    if basepath == "/":
+        return node
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.props:
+            for key in ("href", "src"):
+                url = current.props.get(key)
+                if url is not None and url.startswith("/"):
+                    current.props[key] = basepath + url[1:]
+        if current.children:
+            stack.extend(current.children)
+    return node
+
+
+class Template():
+    def __init__(self, text, basepath="/", dependencies=None):
+        self.dependencies = dependencies or {}
+        self.segments = SLOT_PATTERN.split(rewrite_basepath(text, basepath))
+        self.slots = [(i, self.segments[i]) for i in range(1, len(self.segments), 2)]
+
+    def render(self, title, content):
+        values = {"Title": escape_text(title), "Content": content}
+        parts = list(self.segments)
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return "".join(parts)
+
+    def write(self, fp, title, node):
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                fp.write(segment)
+            elif segment == "Title":
+                fp.write(escape_text(title))
+            else:
+                node.write_html(fp)
+
+    def __repr__(self):
+        return f'Template({[name for _, name in self.slots]})'
+
+
+class TemplateLoader():
+    def __init__(self, default_path, basepath="/", templates_dir="templates", content_dir=None):
+        self.default_path = default_path
+        self.basepath = basepath
+        self.templates_dir = templates_dir
+        self.content_dir = content_dir
+        self.templates = {}
+
+    def load(self, template_path):
+        template = self.templates.get(template_path)
+        if template is None:
+            dependencies = {}
+            text = self._expand(template_path, [template_path], dependencies)
+            template = Template(text, self.basepath, dependencies)
+            self.templates[template_path] = template
+        return template
+
+    def _expand(self, path, stack, dependencies):
+        with open(path, "r") as t:
+            text = t.read()
+        dependencies[path] = hash_file(path)
+
+        def include(match):
+            partial_path = os.path.join(self.templates_dir, match.group(1))
+            if partial_path in stack:
+                raise Exception(f"include cycle: {' -> '.join(stack + [partial_path])}")
+            return self._expand(partial_path, stack + [partial_path], dependencies)
+
+        return INCLUDE_PATTERN.sub(include, text)
+
+    def refresh(self):
+        # a long-lived loader drops templates whose file or partials changed since they were parsed
+        stale = [path for path, template in self.templates.items()
+                 if any(not os.path.isfile(dep) or hash_file(dep) != digest
+                        for dep, digest in template.dependencies.items())]
+        for path in stale:
+            del self.templates[path]
+        return len(stale)
+
+    def candidates(self, from_path):
+        if self.content_dir is None:
+            return []
+        directory = os.path.dirname(os.path.relpath(from_path, self.content_dir))
+        candidates = []
+        while directory:
+            candidates.append(os.path.join(self.templates_dir, directory + ".html"))
+            directory = os.path.dirname(directory)
+        return candidates
+
+    def for_page(self, from_path, metadata=None):
+        if metadata and metadata.get("template"):
+            template = self.load(os.path.join(self.templates_dir, metadata["template"]))
+            return template, dict(template.dependencies)
+
+        dependencies = {}
+        for candidate in self.candidates(from_path):
+            if os.path.exists(candidate):
+                template = self.load(candidate)
+                break
+            dependencies[candidate] = None
+        else:
+            template = self.load(self.default_path)
+        dependencies.update(template.dependencies)
+        return template, dependencies
+
+
+def load_template(template_path, basepath="/"):
+    return TemplateLoader(template_path, basepath).load(template_path)
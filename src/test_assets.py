@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from assets import copy_file, sync_dir
+from fixtures import write_file
+
+
+class TestSyncDir(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.manifest = os.path.join(self.tmp.name, ".cache", "assets.json")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "tom.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, use_hash=False):
+        return sync_dir(self.static, self.dest, self.manifest, use_hash)
+
+    def test_copies_only_changed_files(self):
+        self.assertEqual(self.sync(), {"copied": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.sync(), {"copied": 0, "unchanged": 2, "removed": 0})
+        write_file(os.path.join(self.static, "index.css"), "body {color: red}")
+        self.assertEqual(self.sync(), {"copied": 1, "unchanged": 1, "removed": 0})
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body {color: red}")
+
+    def test_hash_mode_ignores_touched_files(self):
+        self.sync(use_hash=True)
+        css = os.path.join(self.static, "index.css")
+        os.utime(css, ns=(0, 10**9))
+        self.assertEqual(self.sync(use_hash=True)["copied"], 0)
+
+    def test_removes_stale_assets_only(self):
+        self.sync()
+        write_file(os.path.join(self.dest, "index.html"), "<html></html>")
+        os.remove(os.path.join(self.static, "images", "tom.png"))
+        self.assertEqual(self.sync()["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_large_file_copy(self):
+        source = os.path.join(self.static, "big.bin")
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        with open(source, "wb") as f:
+            f.write(data)
+        dest = os.path.join(self.dest, "big.bin")
+        copy_file(source, dest, os.stat(source))
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(os.stat(dest).st_mtime_ns, os.stat(source).st_mtime_ns)
+
+
+if __name__ == "__main__":
+    unittest.main()
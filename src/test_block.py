@@ -1,6 +1,52 @@
+import io
+import random
+import re
 import unittest
+from enum import Enum
+import block
 from block import BlockType
-from block import block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from block import block_to_block_type, iter_blocks, markdown_to_blocks, markdown_to_html_node
+from block import block_to_html_node, register_block_type
+from htmlnode import LeafNode, ParentNode, PlainLeafNode
+
+
+# the regex-per-line classifier block_to_block_type replaced, kept as the reference it must agree with
+def legacy_block_to_block_type(block):
+    match_headings = re.match(r"^\#{1,6} .+", block)
+    if match_headings:
+        return BlockType.HEAD
+
+    match_code = re.match(r"^\`\`\`.+\`\`\`$", block.strip(), re.DOTALL)
+    if match_code:
+        return BlockType.CODE
+
+    lines = block.split("\n")
+    quote = True
+    for line in lines:
+        match_quote = re.match(r"^\>", line)
+        if not match_quote:
+            quote = False
+            break
+    unordered = True
+    for line in lines:
+        match_unordered = re.match(r"^\-", line)
+        if not match_unordered:
+            unordered = False
+            break
+    ordered = True
+    for i in range(len(lines)):
+        if not lines[i].startswith(f"{i+1}. "):
+            ordered = False
+            break
+
+    if quote:
+        return BlockType.QUOTE
+    elif unordered:
+        return BlockType.UN_O_LIST
+    elif ordered:
+        return BlockType.O_LIST
+    return BlockType.PARAGRAPH
+
 
 class TestBlocks(unittest.TestCase):
     def test_full_split(self):
@@ -31,6 +77,89 @@ This is the same paragraph on a new line
         self.assertListEqual(markdown_to_blocks("\n\n\t  \n"), [])
 
 
+class TestIterBlocks(unittest.TestCase):
+    def test_matches_markdown_to_blocks(self):
+        markdown_text = "\n# Title\n\nThis is **bolded** paragraph\nsame paragraph\n\n\n\n- a list\n- with items\n"
+        blocks = [block for _, block in iter_blocks(io.StringIO(markdown_text))]
+        self.assertListEqual(blocks, markdown_to_blocks(markdown_text))
+
+    def test_yields_block_types(self):
+        markdown_text = "# Title\n\n> quote\n\n1. one\n2. two\n"
+        self.assertListEqual(list(iter_blocks(io.StringIO(markdown_text))),
+                             [(BlockType.HEAD, "# Title"),
+                              (BlockType.QUOTE, "> quote"),
+                              (BlockType.O_LIST, "1. one\n2. two")])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        markdown_text = "intro\n\n```\nfirst\n\n\nsecond\n```\n\nafter"
+        self.assertListEqual(list(iter_blocks(io.StringIO(markdown_text))),
+                             [(BlockType.PARAGRAPH, "intro"),
+                              (BlockType.CODE, "```\nfirst\n\n\nsecond\n```"),
+                              (BlockType.PARAGRAPH, "after")])
+
+    def test_single_line_code(self):
+        self.assertListEqual(list(iter_blocks(["```x```\n", "\n", "text\n"])),
+                             [(BlockType.CODE, "```x```"), (BlockType.PARAGRAPH, "text")])
+
+    def test_unterminated_fence_is_read_as_text(self):
+        lines = ["intro\n", "\n", "```\n"] + [f"line {i}\n" if i % 3 else "\n" for i in range(300)]
+        blocks = list(iter_blocks(lines))
+        self.assertEqual(blocks[0], (BlockType.PARAGRAPH, "intro"))
+        self.assertEqual(blocks[1], (BlockType.PARAGRAPH, "```"))
+        self.assertEqual(blocks[2], (BlockType.PARAGRAPH, "line 1\nline 2"))
+        self.assertEqual(blocks[-1], (BlockType.PARAGRAPH, "line 298\nline 299"))
+
+    def test_large_closed_fence_stays_code(self):
+        body = ["x = compute(y)\n", "\n"] * 100000
+        blocks = list(iter_blocks(["```\n"] + body + ["```\n", "\n", "after\n"]))
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(blocks[0][0], BlockType.CODE)
+        self.assertGreater(len(blocks[0][1]), 1024 * 1024)
+        self.assertEqual(blocks[1], (BlockType.PARAGRAPH, "after"))
+
+
+class CustomBlockType(Enum):
+    TABLE = "table"
+
+
+class TestBlockRegistry(unittest.TestCase):
+    def setUp(self):
+        self.classifiers = dict(block.BLOCK_CLASSIFIERS)
+        self.renderers = dict(block.BLOCK_RENDERERS)
+
+    def tearDown(self):
+        block.BLOCK_CLASSIFIERS.clear()
+        block.BLOCK_CLASSIFIERS.update(self.classifiers)
+        block.BLOCK_RENDERERS.clear()
+        block.BLOCK_RENDERERS.update(self.renderers)
+
+    def test_custom_block_type(self):
+        def table_to_html(text):
+            rows = [ParentNode("tr", [LeafNode("td", cell.strip()) for cell in line.strip("|").split("|")])
+                    for line in text.split("\n")]
+            return ParentNode("table", rows)
+
+        register_block_type(CustomBlockType.TABLE, table_to_html, "|", lambda text: text.endswith("|"))
+        self.assertEqual(block_to_block_type("| a | b |\n| c | d |"), CustomBlockType.TABLE)
+        self.assertEqual(block_to_block_type("| not a table"), BlockType.PARAGRAPH)
+        self.assertEqual(markdown_to_html_node("| a | b |").to_html(),
+                         "<div><table><tr><td>a</td><td>b</td></tr></table></div>")
+
+    def test_custom_type_sharing_a_first_character(self):
+        register_block_type(CustomBlockType.TABLE, lambda text: LeafNode("hr", ""), "-", lambda text: text == "---")
+        self.assertEqual(block_to_block_type("---"), CustomBlockType.TABLE)
+        self.assertEqual(block_to_block_type("- item"), BlockType.UN_O_LIST)
+
+    def test_unknown_block_type(self):
+        with self.assertRaises(ValueError):
+            block_to_html_node("text", CustomBlockType.TABLE)
+
+    def test_long_ordered_list(self):
+        text = "\n".join(f"{i}. item {i}" for i in range(1, 12))
+        html = block_to_html_node(text, BlockType.O_LIST).to_html()
+        self.assertIn("<li>item 10</li><li>item 11</li>", html)
+
+
 class TestBlocks(unittest.TestCase):
     def test_headings(self):
         self.assertEqual(block_to_block_type("# Heading 1"), BlockType.HEAD)
@@ -82,6 +211,35 @@ print("Hello, world!")
         self.assertEqual(block_to_block_type("## Test Head"), BlockType.HEAD)
 
 
+    def test_matches_legacy_classifier(self):
+        fragments = ["#", "# ", "###### ", "#######", "```", "`", ">", "> ", "-", "- ", "*",
+                     "1. ", "2. ", "3. ", "10. ", "1.", " ", "\t", "\u00a0", "\n", "\n\n", "a", "x y"]
+        rng = random.Random(8)
+        for _ in range(20000):
+            block = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(block_to_block_type(block), legacy_block_to_block_type(block), repr(block))
+
+    def test_codeblock_is_escaped(self):
+        node = markdown_to_html_node("```\nif a < b && c > d:\n    print(\"<p>\")\n```")
+        self.assertEqual(node.to_html(),
+                         "<div><pre><code>if a &lt; b &amp;&amp; c > d:\n    print(\"&lt;p>\")</code></pre></div>")
+
+    def test_code_shows_character_references_as_written(self):
+        node = markdown_to_html_node("```\nwrite &lt;p&gt; or &amp; in HTML\n```")
+        self.assertEqual(node.to_html(),
+                         "<div><pre><code>write &amp;lt;p&amp;gt; or &amp;amp; in HTML</code></pre></div>")
+        node = markdown_to_html_node("the `&amp;` entity is &amp;")
+        self.assertEqual(node.to_html(), "<div><p>the <code>&amp;amp;</code> entity is &amp;</p></div>")
+
+    def test_only_paragraphs_with_special_characters_escape_their_runs(self):
+        node = markdown_to_html_node("plain **bold** and `code`\n\n**a < b** and `&`")
+        plain, special = node.children
+        self.assertEqual({type(child) for child in plain.children}, {PlainLeafNode})
+        self.assertNotIn(PlainLeafNode, {type(child) for child in special.children})
+        self.assertEqual(node.to_html(), "<div><p>plain <b>bold</b> and <code>code</code></p>"
+                                         "<p><b>a &lt; b</b> and <code>&amp;</code></p></div>")
+
+
 
     class TestBlocksToHTML(unittest.TestCase):
         def test_paragraphs(self):
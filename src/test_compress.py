@@ -0,0 +1,132 @@
+import gzip
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+
+from compress import Compressor
+from output import OutputWriter, prune_outputs
+
+
+class TestCompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = os.path.join(self.root, "index.html")
+        self.html = "<p>" + "hello " * 400 + "</p>"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_gzip_sibling_from_the_written_chunks(self):
+        compressor = Compressor(["gz"], min_size=100, workers=2)
+        OutputWriter(compressor).write(self.page, self.html)
+        compressor.close()
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), self.html)
+        self.assertEqual(os.stat(self.page + ".gz").st_mtime_ns, os.stat(self.page).st_mtime_ns)
+        self.assertEqual(compressor.compressed, 1)
+
+    def test_streamed_page_is_compressed_without_reading_it_back(self):
+        compressor = Compressor(["gz"], min_size=100, workers=1)
+        compressor._compress = None
+        writer = OutputWriter(compressor)
+        with writer.open(self.page) as f:
+            for word in self.html.split(" "):
+                f.write(word + " ")
+        with gzip.open(self.page + ".gz", "rt") as f, open(self.page) as page:
+            self.assertEqual(f.read(), page.read())
+        self.assertEqual(os.stat(self.page + ".gz").st_mtime_ns, os.stat(self.page).st_mtime_ns)
+        self.assertEqual(compressor.compressed, 1)
+        with writer.open(self.page) as f:
+            f.write("<p>hi</p>")
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+        self.assertEqual([name for name in os.listdir(self.root) if name.endswith(".tmp")], [])
+
+    def test_concurrent_submits_share_one_pool(self):
+        compressor = Compressor(["gz"], min_size=100, workers=4)
+        paths = [os.path.join(self.root, f"page{i}.html") for i in range(16)]
+        pools = set()
+
+        def submit(path):
+            compressor.submit(path, [self.html.encode("utf-8")])
+            pools.add(id(compressor.pool))
+
+        for path in paths:
+            with open(path, "w") as f:
+                f.write(self.html)
+        threads = [threading.Thread(target=submit, args=(path,)) for path in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        compressor.close()
+        self.assertEqual(len(pools), 1)
+        self.assertEqual(compressor.compressed, 16)
+        for path in paths:
+            with gzip.open(path + ".gz", "rt") as f:
+                self.assertEqual(f.read(), self.html)
+
+    def test_skips_unchanged_and_small_files(self):
+        compressor = Compressor(["gz"], min_size=100, workers=1)
+        writer = OutputWriter(compressor)
+        writer.write(self.page, self.html)
+        writer.write(self.page, self.html)
+        writer.write(os.path.join(self.root, "small.html"), "<p>hi</p>")
+        writer.write(os.path.join(self.root, "logo.png"), "x" * 1000)
+        self.assertEqual(compressor.compressed, 1)
+        self.assertEqual(sorted(os.listdir(self.root)), ["index.html", "index.html.gz", "logo.png", "small.html"])
+
+    def test_stale_sibling_is_rebuilt(self):
+        compressor = Compressor(["gz"], min_size=100, workers=1)
+        writer = OutputWriter(compressor)
+        writer.write(self.page, self.html)
+        os.utime(self.page + ".gz", ns=(0, 0))
+        self.assertFalse(compressor.is_current(self.page))
+        writer.write(self.page, self.html)
+        self.assertTrue(compressor.is_current(self.page))
+
+    def test_sibling_is_removed_when_file_shrinks(self):
+        compressor = Compressor(["gz"], min_size=100, workers=1)
+        writer = OutputWriter(compressor)
+        writer.write(self.page, self.html)
+        writer.write(self.page, "<p>hi</p>")
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+        # a sibling left behind by an older build is noticed even when the page itself is unchanged
+        with open(self.page + ".gz", "wb") as f:
+            f.write(b"stale")
+        self.assertFalse(compressor.is_current(self.page))
+        writer.write(self.page, "<p>hi</p>")
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+    def test_prune_keeps_siblings_of_compressible_files_only(self):
+        compressor = Compressor(["gz"], min_size=100, workers=1)
+        writer = OutputWriter(compressor)
+        small = os.path.join(self.root, "small.html")
+        writer.write(self.page, self.html)
+        writer.write(small, "<p>hi</p>")
+        for path in [small + ".gz", self.page + ".br"]:
+            with open(path, "wb") as f:
+                f.write(b"stale")
+        self.assertEqual(writer.prune(self.root, [self.page, small]), 2)
+        self.assertEqual(sorted(os.listdir(self.root)), ["index.html", "index.html.gz", "small.html"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            Compressor(["lzma-9000"])
+
+    def test_pickled_compressor_runs_inline(self):
+        compressor = pickle.loads(pickle.dumps(Compressor(["gz"], min_size=10, workers=4)))
+        self.assertEqual((compressor.workers, compressor.min_size), (1, 10))
+
+    def test_siblings_follow_their_file(self):
+        compressor = Compressor(["gz"], min_size=100, workers=1)
+        OutputWriter(compressor).write(self.page, self.html)
+        self.assertEqual(prune_outputs(self.root, [self.page, self.page + ".gz"]), 0)
+        self.assertEqual(prune_outputs(self.root, []), 2)
+        self.assertEqual(os.listdir(self.root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from bench.corpus import generate_corpus
+from generator import find_pages, generate_pages
+
+
+class TestCorpus(unittest.TestCase):
+    def read_tree(self, paths):
+        contents = []
+        for path in paths:
+            with open(path) as f:
+                contents.append(f.read())
+        return contents
+
+    def test_reproducible(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            a = generate_corpus(first, pages=20, depth=3, seed=4)
+            b = generate_corpus(second, pages=20, depth=3, seed=4)
+            self.assertEqual([os.path.relpath(p, first) for p in a], [os.path.relpath(p, second) for p in b])
+            self.assertEqual(self.read_tree(a), self.read_tree(b))
+
+    def test_corpus_builds(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = generate_corpus(root, pages=10, blocks=20, density=0.5)
+            pages = find_pages(os.path.join(root, "content"), os.path.join(root, "docs"))
+            self.assertEqual(sorted(paths), sorted(source for source, _ in pages))
+            generate_pages(pages, os.path.join(root, "template.html"), "/")
+            self.assertTrue(all(os.path.exists(dest) for _, dest in pages))
+
+
+if __name__ == "__main__":
+    unittest.main()
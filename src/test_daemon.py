@@ -0,0 +1,94 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import client
+from daemon import BuildHandler, BuildServer
+from fixtures import write_file
+from main import run_build
+
+
+class TestBuildServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write_file(os.path.join(self.root, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.root, "static/index.css"), "body {}")
+        write_file(os.path.join(self.root, "content/index.md"), "# Home\n\n[post](/blog/post)")
+        write_file(os.path.join(self.root, "content/blog/post/index.md"), "# Post")
+        self.socket = os.path.join(self.root, "build.sock")
+        self.sessions = []
+        self.server = BuildServer(self.socket, self.build)
+        self.thread = threading.Thread(target=self.server.run)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            client.stop(self.socket)
+            self.thread.join()
+        self.tmp.cleanup()
+
+    def build(self, argv, session):
+        self.sessions.append(session)
+        return run_build(argv, session)
+
+    def request(self, *argv):
+        return client.build(argv, self.socket, cwd=self.root)
+
+    def test_builds_reuse_the_session(self):
+        response = self.request("--incremental", "/")
+        self.assertTrue(response["ok"], response)
+        self.assertEqual(response["result"]["pages"], 2)
+        self.assertIn("2 generated, 0 unchanged, 0 removed", [record["message"] for record in response["log"]])
+        self.assertTrue(os.path.exists(os.path.join(self.root, "docs", "blog", "post", "index.html")))
+
+        write_file(os.path.join(self.root, "content/blog/post/index.md"), "# Changed")
+        response = self.request("--incremental", "/")
+        self.assertIn("1 generated, 1 unchanged, 0 removed", [record["message"] for record in response["log"]])
+        with open(os.path.join(self.root, "docs", "blog", "post", "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Changed</title><div><h1>Changed</h1></div>")
+        self.assertIs(self.sessions[0], self.sessions[1])
+        self.assertIn("templates", self.sessions[0])
+
+    def test_template_change_is_picked_up(self):
+        self.request("-q", "/")
+        write_file(os.path.join(self.root, "template.html"), "<h1>{{ Title }}</h1>")
+        self.assertTrue(self.request("-q", "/")["ok"])
+        with open(os.path.join(self.root, "docs", "index.html")) as f:
+            self.assertEqual(f.read(), "<h1>Home</h1>")
+
+    def test_failures_are_reported(self):
+        response = self.request("--no-such-flag")
+        self.assertFalse(response["ok"])
+        self.assertIn("unrecognized arguments", response["output"])
+
+        response = self.request("-q", "--strict-links", "/")
+        self.assertTrue(response["ok"])
+        os.remove(os.path.join(self.root, "content", "blog", "post", "index.md"))
+        response = self.request("-q", "--strict-links", "/")
+        self.assertEqual(response["error"], "1 broken links")
+        self.assertEqual(response["log"], [{"level": "WARNING", "message": "broken link in content/index.md: /blog/post"}])
+        self.assertTrue(self.request("-q", "/")["ok"])
+
+    def test_silent_client_does_not_block_later_builds(self):
+        with mock.patch.object(BuildHandler, "timeout", 0.2), \
+                socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as silent:
+            silent.connect(self.socket)
+            silent.sendall(b'{"argv": ')
+            response = self.request("-q", "/")
+        self.assertTrue(response["ok"], response)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "docs", "index.html")))
+
+    def test_second_server_refuses_the_socket(self):
+        with self.assertRaises(Exception):
+            BuildServer(self.socket, self.build)
+        self.assertEqual(client.stop(self.socket), {"ok": True})
+        self.thread.join()
+        self.assertFalse(os.path.exists(self.socket))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from block import iter_blocks
+from fileio import IOV_MAX, ChunkBuffer, ChunkWriter, hash_chunks, open_source, write_chunks
+from manifest import hash_bytes
+
+
+class TestOpenSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_blocks(self, threshold):
+        with open_source(self.path, threshold) as lines:
+            return list(iter_blocks(lines))
+
+    def test_mapped_lines_match_text_lines(self):
+        with open(self.path, "wb") as f:
+            f.write("# Título\r\n\r\nsome *text*\r\n\r\n```\ncode\n```\nlast line without newline".encode("utf-8"))
+        self.assertEqual(self.read_blocks(threshold=0), self.read_blocks(threshold=1 << 30))
+
+    def test_empty_file(self):
+        open(self.path, "w").close()
+        self.assertEqual(self.read_blocks(threshold=0), [])
+
+
+class TestChunks(unittest.TestCase):
+    def test_buffer_groups_small_writes(self):
+        buffer = ChunkBuffer(parts_per_chunk=3)
+        for part in ["<p>", "hello", "</p>", "é"]:
+            buffer.write(part)
+        chunks = buffer.getchunks()
+        self.assertEqual(chunks, [b"<p>hello</p>", "é".encode("utf-8")])
+        self.assertEqual(hash_chunks(chunks), hash_bytes(b"".join(chunks)))
+
+    def test_writer_flushes_once_threshold_is_reached(self):
+        with tempfile.TemporaryFile() as f:
+            out = ChunkWriter(lambda chunks: write_chunks(f.fileno(), chunks), flush_chars=8, parts_per_chunk=2)
+            out.write("<p>")
+            self.assertEqual(os.fstat(f.fileno()).st_size, 0)
+            out.write("héllo")
+            self.assertEqual(out.parts, [])
+            out.write("</p>")
+            out.flush()
+            f.seek(0)
+            data = f.read()
+        self.assertEqual(data, "<p>héllo</p>".encode("utf-8"))
+        self.assertEqual(out.size, len(data))
+
+    def test_write_more_chunks_than_iov_max(self):
+        chunks = [bytes([i % 256]) * (i % 7) for i in range(IOV_MAX * 2 + 3)]
+        with tempfile.TemporaryFile() as f:
+            write_chunks(f.fileno(), chunks)
+            f.seek(0)
+            self.assertEqual(f.read(), b"".join(chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from frontmatter import parse_front_matter
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parses_metadata_and_keeps_body(self):
+        metadata, lines = parse_front_matter(["---\n", "Template: blog.html\n", "\n", "title: Hi\n", "---\n", "# Hi\n"])
+        self.assertEqual(metadata, {"template": "blog.html", "title": "Hi"})
+        self.assertEqual(list(lines), ["# Hi\n"])
+
+    def test_without_front_matter(self):
+        metadata, lines = parse_front_matter(["# Hi", "", "text"])
+        self.assertEqual(metadata, {})
+        self.assertEqual(list(lines), ["# Hi", "", "text"])
+
+    def test_thematic_break_is_not_front_matter(self):
+        source = ["---", "# Hi", "---"]
+        metadata, lines = parse_front_matter(source)
+        self.assertEqual(metadata, {})
+        self.assertEqual(list(lines), source)
+
+    def test_unclosed_front_matter(self):
+        source = ["---", "template: blog.html", "# Hi"]
+        metadata, lines = parse_front_matter(source)
+        self.assertEqual(metadata, {})
+        self.assertEqual(list(lines), source)
+
+
+if __name__ == "__main__":
+    unittest.main()
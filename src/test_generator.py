@@ -1,6 +1,13 @@
+import os
+import tempfile
+import tracemalloc
 import unittest
 
-from generator import extract_title
+from block import BlockType, iter_blocks
+from fixtures import write_file
+from generator import (extract_title, split_title, find_pages, generate_pages, generate_pages_async,
+                       generate_pages_incremental, write_page)
+from output import OutputWriter
 
 class TestExtractTitle(unittest.TestCase):
     def test_basic_header(self):
@@ -24,5 +31,203 @@ class TestExtractTitle(unittest.TestCase):
         markdown = "# First\n\n## Second\n\n### Third"
         self.assertEqual(extract_title(markdown), "First")
 
+
+class TestSplitTitle(unittest.TestCase):
+    def test_title_block_is_kept(self):
+        blocks = [("paragraph", "intro"), ("heading", "# Title"), ("paragraph", "body")]
+        title, rest = split_title(iter(blocks))
+        self.assertEqual(title, "Title")
+        self.assertListEqual(list(rest), blocks)
+
+    def test_no_header_raises_exception(self):
+        with self.assertRaises(Exception):
+            split_title([("paragraph", "no title")])
+
+    def test_look_ahead_is_capped(self):
+        blocks = (("paragraph", "no title yet") for _ in range(10 ** 6))
+        with self.assertRaisesRegex(Exception, "first 100 characters"):
+            split_title(blocks, lookahead=100)
+
+    def test_unterminated_fence_before_title(self):
+        lines = ["```\n"] + ["code\n", "\n"] * 15 + ["# Title\n", "\n", "body\n"]
+        title, rest = split_title(iter_blocks(lines))
+        self.assertEqual(title, "Title")
+        self.assertEqual(list(rest)[-1], (BlockType.PARAGRAPH, "body"))
+
+    def test_late_title_is_found_without_a_cap(self):
+        blocks = [("paragraph", "x" * 1024)] * 2048 + [("heading", "# Late")]
+        title, rest = split_title(iter(blocks))
+        self.assertEqual(title, "Late")
+        self.assertEqual(len(list(rest)), len(blocks))
+
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".cache", "manifest.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_outputs(self):
+        outputs = {}
+        for from_path, dest_path in find_pages(self.content, self.dest):
+            with open(dest_path) as f:
+                outputs[dest_path] = f.read()
+        return outputs
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def build(self, basepath="/"):
+        return generate_pages_incremental(self.content, self.template, self.dest, basepath, self.manifest)
+
+    def test_find_pages(self):
+        pages = find_pages(self.content, self.dest)
+        self.assertEqual(pages, [
+            (os.path.join(self.content, "blog", "post", "index.md"),
+             os.path.join(self.dest, "blog", "post", "index.html")),
+            (os.path.join(self.content, "index.md"), os.path.join(self.dest, "index.html")),
+        ])
+
+    def test_second_build_skips_unchanged(self):
+        self.assertEqual(self.build(), {"generated": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.build(), {"generated": 0, "unchanged": 2, "removed": 0})
+
+    def test_changed_source_is_regenerated(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Changed")
+        self.assertEqual(self.build(), {"generated": 1, "unchanged": 1, "removed": 0})
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_template_or_basepath_change_rebuilds_everything(self):
+        self.build()
+        self.assertEqual(self.build(basepath="/site/")["generated"], 2)
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(basepath="/site/")["generated"], 2)
+
+    def test_partial_change_rebuilds_only_pages_including_it(self):
+        write_file(os.path.join(self.root, "templates", "nav.html"), "<nav>home</nav>")
+        write_file(os.path.join(self.root, "templates", "blog.html"), "{{ include nav.html }}{{ Content }}")
+        self.build()
+        with open(os.path.join(self.dest, "blog", "post", "index.html")) as f:
+            self.assertEqual(f.read(), "<nav>home</nav><div><h1>Post</h1></div>")
+
+        write_file(os.path.join(self.root, "templates", "nav.html"), "<nav>blog</nav>")
+        self.assertEqual(self.build(), {"generated": 1, "unchanged": 1, "removed": 0})
+        with open(os.path.join(self.dest, "blog", "post", "index.html")) as f:
+            self.assertEqual(f.read(), "<nav>blog</nav><div><h1>Post</h1></div>")
+
+    def test_new_section_template_rebuilds_only_that_section(self):
+        self.build()
+        write_file(os.path.join(self.root, "templates", "blog.html"), "<b>{{ Title }}</b>")
+        self.assertEqual(self.build(), {"generated": 1, "unchanged": 1, "removed": 0})
+        with open(os.path.join(self.dest, "blog", "post", "index.html")) as f:
+            self.assertEqual(f.read(), "<b>Post</b>")
+
+    def test_front_matter_selects_template(self):
+        write_file(os.path.join(self.root, "templates", "bare.html"), "{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "---\ntemplate: bare.html\n---\n# Home")
+        self.build()
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertEqual(f.read(), "<div><h1>Home</h1></div>")
+        write_file(os.path.join(self.root, "templates", "bare.html"), "<main>{{ Content }}</main>")
+        self.assertEqual(self.build(), {"generated": 1, "unchanged": 1, "removed": 0})
+
+    def test_deleted_source_output_is_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.assertEqual(self.build(), {"generated": 0, "unchanged": 1, "removed": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+
+class TestParallelBuild(SiteTestCase):
+    def test_pages_report_their_links(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post) and [out](https://x.org)")
+        pages = find_pages(self.content, self.dest)
+        sequential = generate_pages(pages, self.template, "/")
+        self.assertEqual(sequential[os.path.join(self.content, "index.md")]["links"], ["/blog/post", "https://x.org"])
+        self.assertEqual(generate_pages(pages, self.template, "/", jobs=2), sequential)
+
+    def test_pool_output_matches_sequential(self):
+        for i in range(10):
+            write_file(os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\nbody **{i}**")
+        pages = find_pages(self.content, self.dest)
+        generate_pages(pages, self.template, "/")
+        sequential = self.read_outputs()
+        generate_pages(pages, self.template, "/", jobs=3)
+        self.assertEqual(self.read_outputs(), sequential)
+
+    def test_rebuild_keeps_unchanged_outputs(self):
+        pages = find_pages(self.content, self.dest)
+        generate_pages(pages, self.template, "/")
+        for _, dest_path in pages:
+            os.utime(dest_path, ns=(0, 0))
+        write_file(os.path.join(self.content, "index.md"), "# Changed")
+        writer = OutputWriter()
+        generate_pages(pages, self.template, "/", jobs=2, writer=writer)
+        self.assertEqual(writer.stats(), {"written": 1, "unchanged": 1, "removed": 0})
+        self.assertEqual(os.stat(os.path.join(self.dest, "blog", "post", "index.html")).st_mtime_ns, 0)
+
+    def test_pool_reports_failing_source(self):
+        broken = os.path.join(self.content, "broken.md")
+        write_file(broken, "no title here")
+        with self.assertRaises(Exception) as ctx:
+            generate_pages(find_pages(self.content, self.dest), self.template, "/", jobs=2)
+        self.assertIn(broken, str(ctx.exception))
+
+
+
+class TestWritePage(SiteTestCase):
+    def test_large_page_streams_in_bounded_memory(self):
+        source = os.path.join(self.content, "big.md")
+        paragraph = "a **bold** claim about elves and `code` in a paragraph of words " * 8
+        write_file(source, "# Big\n\n" + "\n\n".join([paragraph] * 6000))
+        dest = os.path.join(self.dest, "big.html")
+        tracemalloc.start()
+        try:
+            write_page(source, self.template, dest, "/")
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        size = os.path.getsize(dest)
+        self.assertGreater(size, 3 * 1024 * 1024)
+        self.assertLess(peak, size / 4)
+        # an identical render leaves the page and its mtime alone
+        os.utime(dest, ns=(0, 0))
+        writer = OutputWriter()
+        write_page(source, self.template, dest, "/", writer=writer)
+        self.assertEqual(writer.stats(), {"written": 0, "unchanged": 1, "removed": 0})
+        self.assertEqual(os.stat(dest).st_mtime_ns, 0)
+        self.assertEqual(sorted(os.listdir(self.dest)), ["big.html"])
+
+
+class TestAsyncPipeline(SiteTestCase):
+    def test_pipeline_output_matches_sequential(self):
+        for i in range(20):
+            write_file(os.path.join(self.content, "blog", f"page{i}.md"), f"# Page {i}\n\nbody _{i}_")
+        pages = find_pages(self.content, self.dest)
+        sequential = generate_pages(pages, self.template, "/")
+        outputs = self.read_outputs()
+        self.assertEqual(generate_pages_async(pages, self.template, "/", io_workers=3, queue_size=1), sequential)
+        self.assertEqual(self.read_outputs(), outputs)
+
+    def test_pipeline_reports_failing_sources_in_order(self):
+        write_file(os.path.join(self.content, "a.md"), "no title")
+        write_file(os.path.join(self.content, "z.md"), "no title either")
+        with self.assertRaises(Exception) as ctx:
+            generate_pages(find_pages(self.content, self.dest), self.template, "/", io_workers=2)
+        message = str(ctx.exception)
+        self.assertLess(message.index("a.md"), message.index("z.md"))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import CodeNode, HTMLNode, LeafNode, ParentNode, RawNode, escape_attr, escape_text
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_html(self):
@@ -68,5 +69,47 @@ class TestHTMLNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+                                  LeafNode("a", "link", {"href": "/x"})])
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+
+    def test_render_writes_each_part_as_it_goes(self):
+        node = ParentNode("div", [LeafNode("p", "one"), ParentNode("p", [LeafNode("b", "two")])])
+        parts = []
+        node.render(parts.append)
+        self.assertEqual(parts, ["<div>", "<p>one</p>", "<p>", "<b>two</b>", "</p>", "</div>"])
+
+    def test_missing_children_raises(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", None).to_html()
+
+    def test_leaf_text_is_escaped(self):
+        self.assertEqual(LeafNode("p", "a < b & c > d").to_html(), "<p>a &lt; b &amp; c > d</p>")
+        self.assertEqual(LeafNode(None, 'say "hi"').to_html(), 'say "hi"')
+
+    def test_character_references_are_kept(self):
+        self.assertEqual(escape_text("&copy; &#8212; &#x2014; & &amp"), "&copy; &#8212; &#x2014; &amp; &amp;amp")
+
+    def test_code_escapes_every_ampersand(self):
+        self.assertEqual(CodeNode("code", "&amp; &#8212; a<b && c").to_html(),
+                         "<code>&amp;amp; &amp;#8212; a&lt;b &amp;&amp; c</code>")
+
+    def test_attribute_values_are_escaped(self):
+        node = LeafNode("a", "x", {"href": '/search?q="a"&b=<c>', "title": "plain"})
+        self.assertEqual(node.to_html(), '<a href="/search?q=&quot;a&quot;&amp;b=<c>" title="plain">x</a>')
+        self.assertEqual(escape_attr("/blog/post"), "/blog/post")
+
+    def test_raw_node_is_not_escaped(self):
+        node = ParentNode("div", [RawNode("<p>a &lt; b</p>"), LeafNode(None, "<")])
+        self.assertEqual(node.to_html(), "<div><p>a &lt; b</p>&lt;</div>")
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode(), LeafNode("b", "x"), ParentNode("div", []), RawNode("")):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import os
+import unittest
+
+from links import check_links, is_internal, resolve_target
+
+
+class TestLinks(unittest.TestCase):
+    def test_is_internal(self):
+        self.assertTrue(is_internal("/blog/tom"))
+        self.assertTrue(is_internal("../contact/"))
+        self.assertFalse(is_internal("https://www.boot.dev"))
+        self.assertFalse(is_internal("//cdn.example.com/x.js"))
+        self.assertFalse(is_internal("mailto:tom@example.com"))
+        self.assertFalse(is_internal("#top"))
+
+    def test_resolve_target(self):
+        self.assertEqual(resolve_target("/", "blog"), "")
+        self.assertEqual(resolve_target("/blog/tom/?page=2#intro", ""), "blog/tom")
+        self.assertEqual(resolve_target("../images/a%20b.png", "blog/tom"), "blog/images/a b.png")
+
+    def test_check_links(self):
+        dest = os.path.join("site", "docs")
+        pages = [("content/index.md", os.path.join(dest, "index.html")),
+                 ("content/blog/tom/index.md", os.path.join(dest, "blog", "tom", "index.html"))]
+        index = {
+            "content/index.md": ["/", "/blog/tom", "/images/tom.png", "https://boot.dev", "/blog/bombadil"],
+            "content/blog/tom/index.md": ["../../", "tom.png", "/index.css#x"],
+        }
+        self.assertEqual(check_links(index, pages, dest, {"index.css", "images/tom.png"}),
+                         [("content/blog/tom/index.md", "tom.png"), ("content/index.md", "/blog/bombadil")])
+
+
+if __name__ == "__main__":
+    unittest.main()
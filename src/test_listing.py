@@ -0,0 +1,140 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from fixtures import write_file
+from generator import template_loader
+from listing import build_metadata_index, find_listings, generate_listings, listing_dir, page_url, read_metadata
+from manifest import load_manifest, save_manifest
+from output import OutputWriter
+
+
+class ListingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.index_path = os.path.join(self.root, ".cache", "metadata.json")
+        self.state_path = os.path.join(self.root, ".cache", "listings.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "old", "index.md"),
+                   "---\ndate: 2020-01-01\n---\n# Old post")
+        write_file(os.path.join(self.content, "blog", "new", "index.md"),
+                   "---\ndate: 2024-05-01\ndescription: Fresh\n---\n\nintro\n\n# New post")
+        write_file(os.path.join(self.content, "blog", "undated.md"), "# Undated")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pages(self):
+        names = [("index.md", "index.html"), ("blog/old/index.md", "blog/old/index.html"),
+                 ("blog/new/index.md", "blog/new/index.html"), ("blog/undated.md", "blog/undated.html")]
+        return [(os.path.join(self.content, src), os.path.join(self.dest, dest)) for src, dest in names]
+
+    def build(self, writer=None):
+        index = build_metadata_index(self.pages(), self.dest, self.index_path)
+        templates = template_loader(self.template, "/site/", self.content)
+        return generate_listings(self.content, self.dest, "/site/", index, templates, writer or OutputWriter(),
+                                 self.state_path, "https://example.com")
+
+
+class TestMetadata(ListingTestCase):
+    def test_read_metadata(self):
+        self.assertEqual(read_metadata(os.path.join(self.content, "blog", "new", "index.md")),
+                         {"date": "2024-05-01", "description": "Fresh", "title": "New post"})
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join(self.dest, "index.html"), self.dest), "/")
+        self.assertEqual(page_url(os.path.join(self.dest, "blog", "new", "index.html"), self.dest), "/blog/new/")
+        self.assertEqual(page_url(os.path.join(self.dest, "blog", "undated.html"), self.dest), "/blog/undated.html")
+
+    def test_index_reuses_unchanged_entries(self):
+        build_metadata_index(self.pages(), self.dest, self.index_path)
+        page = os.path.join(self.content, "blog", "old", "index.md")
+        cached = load_manifest(self.index_path)
+        cached["pages"][page]["metadata"]["title"] = "From cache"
+        save_manifest(self.index_path, cached)
+        self.assertEqual(build_metadata_index(self.pages(), self.dest, self.index_path)[page]["title"], "From cache")
+
+        os.utime(page, ns=(0, 0))
+        self.assertEqual(build_metadata_index(self.pages(), self.dest, self.index_path)[page]["title"], "Old post")
+
+    def test_listing_membership(self):
+        self.assertIsNone(listing_dir(os.path.join(self.content, "index.md"), self.content))
+        self.assertEqual(listing_dir(os.path.join(self.content, "blog", "new", "index.md"), self.content), "blog")
+        self.assertEqual(listing_dir(os.path.join(self.content, "blog", "undated.md"), self.content), "blog")
+        index = build_metadata_index(self.pages(), self.dest)
+        self.assertEqual(find_listings(self.content, index), {"blog": [
+            os.path.join(self.content, "blog", "new", "index.md"),
+            os.path.join(self.content, "blog", "old", "index.md"),
+            os.path.join(self.content, "blog", "undated.md"),
+        ]})
+
+
+class TestListings(ListingTestCase):
+    def test_generates_listing_and_feed(self):
+        undated = datetime(2023, 3, 1, tzinfo=timezone.utc).timestamp()
+        os.utime(os.path.join(self.content, "blog", "undated.md"), (undated, undated))
+        stats = self.build()
+        self.assertEqual((stats["generated"], stats["unchanged"]), (1, 0))
+        with open(os.path.join(self.dest, "blog", "index.html")) as f:
+            html = f.read()
+        self.assertTrue(html.startswith("<title>Blog</title><div><h1>Blog</h1><ul>"
+                                        '<li><a href="/site/blog/new/">New post</a>'
+                                        '<time datetime="2024-05-01">2024-05-01</time></li>'))
+        feed = ET.parse(os.path.join(self.dest, "blog", "feed.xml")).getroot()
+        atom = "{http://www.w3.org/2005/Atom}"
+        self.assertEqual(feed.find(atom + "updated").text, "2024-05-01T00:00:00+00:00")
+        entries = feed.findall(atom + "entry")
+        self.assertEqual([entry.find(atom + "id").text for entry in entries],
+                         ["https://example.com/site/blog/new/", "https://example.com/site/blog/old/",
+                          "https://example.com/site/blog/undated.html"])
+        self.assertEqual(entries[0].find(atom + "summary").text, "Fresh")
+        # an undated page is as recent as its source
+        self.assertEqual(entries[2].find(atom + "updated").text, "2023-03-01T00:00:00+00:00")
+
+    def test_feeds_need_an_absolute_site_url(self):
+        index = build_metadata_index(self.pages(), self.dest)
+        templates = template_loader(self.template, "/site/", self.content)
+        for site_url in ["", "/site"]:
+            with self.assertLogs("listing") as logs:
+                stats = generate_listings(self.content, self.dest, "/site/", index, templates, OutputWriter(),
+                                          site_url=site_url)
+            self.assertEqual(stats["outputs"], [os.path.join(self.dest, "blog", "index.html")])
+            self.assertIn("skipping Atom feeds", logs.output[0])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "feed.xml")))
+        with open(os.path.join(self.dest, "blog", "index.html")) as f:
+            self.assertNotIn("feed", f.read())
+
+    def test_listing_uses_the_page_title(self):
+        write_file(os.path.join(self.content, "blog", "old", "index.md"),
+                   "---\ndate: 2020-01-01\ntitle: Front matter\n---\n# Old post")
+        self.build()
+        with open(os.path.join(self.dest, "blog", "index.html")) as f:
+            html = f.read()
+        self.assertIn(">Old post</a>", html)
+        self.assertNotIn("Front matter", html)
+
+    def test_rebuilt_only_when_metadata_changes(self):
+        self.build()
+        write_file(os.path.join(self.content, "blog", "old", "index.md"),
+                   "---\ndate: 2020-01-01\n---\n# Old post\n\nmore")
+        self.assertEqual(self.build()["generated"], 0)
+        write_file(os.path.join(self.content, "blog", "old", "index.md"),
+                   "---\ndate: 2020-01-01\n---\n# Renamed")
+        self.assertEqual(self.build()["generated"], 1)
+        with open(os.path.join(self.dest, "blog", "index.html")) as f:
+            self.assertIn("Renamed", f.read())
+
+    def test_directory_with_index_is_not_listed(self):
+        write_file(os.path.join(self.content, "blog", "index.md"), "# My blog")
+        self.assertEqual(self.build()["outputs"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
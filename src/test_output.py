@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import output
+from output import OutputWriter, prune_outputs
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.path = os.path.join(self.root, "blog", "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_skips_identical_content(self):
+        writer = OutputWriter()
+        self.assertTrue(writer.write(self.path, "<p>hi</p>"))
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(writer.write(self.path, "<p>hi</p>"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertEqual(writer.stats(), {"written": 1, "unchanged": 1, "removed": 0})
+
+    def test_rewrites_same_size_change(self):
+        writer = OutputWriter()
+        writer.write(self.path, "<p>hi</p>")
+        self.assertTrue(writer.write(self.path, "<p>ho</p>"))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>ho</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_open_buffers_until_close(self):
+        writer = OutputWriter()
+        with writer.open(self.path) as f:
+            f.write("<p>")
+            self.assertFalse(os.path.exists(self.path))
+            f.write("é</p>")
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>é</p>")
+
+    def stream(self, writer, parts):
+        with writer.open(self.path) as f:
+            for part in parts:
+                f.write(part)
+
+    def test_unchanged_streamed_page_needs_no_temp_file(self):
+        parts = [f"<p>paragraph {i}</p>" for i in range(20000)]
+        writer = OutputWriter()
+        self.stream(writer, parts)
+        os.utime(self.path, ns=(0, 0))
+        with mock.patch.object(output, "temp_file", side_effect=AssertionError):
+            self.stream(writer, parts)
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+        self.assertEqual(writer.stats(), {"written": 1, "unchanged": 1, "removed": 0})
+
+    def test_streamed_page_differing_from_the_old_file(self):
+        parts = [f"<p>paragraph {i}</p>" for i in range(20000)]
+        changed = list(parts)
+        changed[15000] = "<p>changed</p>"
+        writer = OutputWriter()
+        for new in [parts, changed, parts + ["<p>more</p>"], parts[:-1], []]:
+            self.stream(writer, new)
+            with open(self.path) as f:
+                self.assertEqual(f.read(), "".join(new))
+            self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+        self.assertEqual(writer.stats(), {"written": 5, "unchanged": 0, "removed": 0})
+
+    def test_failed_page_leaves_the_old_file(self):
+        writer = OutputWriter()
+        writer.write(self.path, "<p>old</p>")
+        with self.assertRaises(ValueError):
+            with writer.open(self.path) as f:
+                f.write("<p>new</p>" * 10000)
+                raise ValueError
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>old</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_prune_removes_files_not_kept(self):
+        writer = OutputWriter()
+        stale = os.path.join(self.root, "old", "index.html")
+        writer.write(self.path, "new")
+        writer.write(stale, "old")
+        self.assertEqual(prune_outputs(self.root, [self.path]), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "old")))
+        self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,12 @@
+import time
 import unittest
 
-from text_processing import text_node_to_html_node, split_nodes_delimiter
+import text_processing
+from text_processing import text_node_to_html_node, split_nodes_delimiter, register_inline_renderer
 from text_processing import extract_markdown_images, extract_markdown_links
-from text_processing import split_nodes_image, split_nodes_link, text_to_textnodes
+from text_processing import split_nodes_image, split_nodes_link, text_to_textnodes, collect_links
 
+from htmlnode import LeafNode
 from textnode import TextType, TextNode
 
 class TestNodeToHtml(unittest.TestCase):
@@ -43,6 +46,14 @@ class TestNodeToHtml(unittest.TestCase):
         with self.assertRaises(TypeError):
             text_node_to_html_node(node)
 
+    def test_register_inline_renderer(self):
+        original = text_processing.INLINE_RENDERERS[TextType.BOLD]
+        try:
+            register_inline_renderer(TextType.BOLD, lambda node: LeafNode("strong", node.text))
+            self.assertEqual(text_node_to_html_node(TextNode("x", TextType.BOLD)).tag, "strong")
+        finally:
+            register_inline_renderer(TextType.BOLD, original)
+
 class TestSplitNodesText(unittest.TestCase):
     def test_simple(self):
         node = TextNode("This is text with a `code block` word", TextType.TEXT)
@@ -105,6 +116,17 @@ class TestExtractMarkdown(unittest.TestCase):
                           ("to youtube", "https://www.youtube.com/@bootdotdev")]
         self.assertListEqual(actual_nodes, expected_nodes)
 
+    def test_nested_brackets_and_parens(self):
+        text = "see [the [1] note](https://en.wikipedia.org/wiki/Foo_(bar)) and ![a (b)](/x_(1).png)"
+        self.assertListEqual(extract_markdown_links(text),
+                             [("the [1] note", "https://en.wikipedia.org/wiki/Foo_(bar)")])
+        self.assertListEqual(extract_markdown_images(text), [("a (b)", "/x_(1).png")])
+
+    def test_does_not_pair_across_unrelated_brackets(self):
+        text = "a [note] (aside) and [link](/x) then ![img](/y.png)"
+        self.assertListEqual(extract_markdown_links(text), [("link", "/x")])
+        self.assertListEqual(extract_markdown_images(text), [("img", "/y.png")])
+
 
 class TestSplitNodesImageLinks(unittest.TestCase):
     def test_split_images(self):
@@ -135,6 +157,62 @@ class TestSplitNodesImageLinks(unittest.TestCase):
         
         self.assertListEqual(actual_nodes, expected_nodes)
 
+    def test_split_links_leaves_images(self):
+        node = TextNode("![img](/a.png) and [link](/b)", TextType.TEXT)
+        self.assertListEqual(split_nodes_link([node]),
+                             [TextNode("![img](/a.png) and ", TextType.TEXT),
+                              TextNode("link", TextType.LINK, "/b")])
+
+
+class TestCollectLinks(unittest.TestCase):
+    def test_collects_link_and_image_urls(self):
+        with collect_links() as outer:
+            text_node_to_html_node(TextNode("home", TextType.LINK, "/"))
+            with collect_links() as inner:
+                text_node_to_html_node(TextNode("tom", TextType.IMAGE, "/tom.png"))
+            text_node_to_html_node(TextNode("plain", TextType.TEXT))
+        self.assertEqual(inner, ["/tom.png"])
+        self.assertEqual(outer, ["/", "/tom.png"])
+
+    def test_nothing_collected_outside(self):
+        text_node_to_html_node(TextNode("home", TextType.LINK, "/"))
+        with collect_links() as links:
+            pass
+        self.assertEqual(links, [])
+
+
+class TestPathologicalInline(unittest.TestCase):
+    # a quadratic scan takes minutes on these, a linear one well under a second
+    LIMIT = 10
+
+    def assertFast(self, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.assertLess(time.perf_counter() - start, self.LIMIT)
+        return result
+
+    def test_megabyte_paragraph_with_50k_links(self):
+        text = " ".join(f"[w{i}](/p/{i})" for i in range(50000))
+        text += " " * (1024 * 1024 - len(text))
+        nodes = self.assertFast(text_to_textnodes, text)
+        self.assertEqual(sum(node.text_type is TextType.LINK for node in nodes), 50000)
+        nodes = self.assertFast(split_nodes_link, [TextNode(text, TextType.TEXT)])
+        self.assertEqual(nodes[-2], TextNode("w49999", TextType.LINK, "/p/49999"))
+        self.assertEqual(len(self.assertFast(extract_markdown_links, text)), 50000)
+
+    def test_unclosed_brackets(self):
+        text = "[" * (1024 * 1024)
+        self.assertEqual(self.assertFast(text_to_textnodes, text), [TextNode(text, TextType.TEXT)])
+        text = "[a](" * (256 * 1024)
+        self.assertEqual(self.assertFast(extract_markdown_links, text), [])
+
+    def test_deep_nesting(self):
+        text = "[" * 100000 + "x" + "]" * 100000 + "(" * 100000 + "/u" + ")" * 100000
+        links = self.assertFast(extract_markdown_links, text)
+        self.assertEqual(len(links), 1)
+        self.assertEqual(len(links[0][1]), 2 + 2 * 99999)
+
+
 class TestTextToNodes(unittest.TestCase):
     def test_full(self):
         text = "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
@@ -153,6 +231,37 @@ class TestTextToNodes(unittest.TestCase):
         
         self.assertListEqual(actual_nodes, expected_nodes)
 
+    def test_matches_split_cascade(self):
+        texts = ["plain text",
+                 "**bold** at start and `code` at end `x`",
+                 "a****b",
+                 "***bold italic***",
+                 "![image](/a.png) then [link](/b) then _it_"]
+        for text in texts:
+            nodes = split_nodes_image([TextNode(text, TextType.TEXT)])
+            nodes = split_nodes_link(nodes)
+            for delimiter, text_type in (("**", TextType.BOLD), ("_", TextType.ITALIC), ("`", TextType.CODE)):
+                nodes = split_nodes_delimiter(nodes, delimiter, text_type)
+            self.assertListEqual(text_to_textnodes(text), nodes)
+
+    def test_empty(self):
+        self.assertListEqual(text_to_textnodes(""), [])
+
+    def test_code_span_is_literal(self):
+        self.assertListEqual(text_to_textnodes("call `my_func(**kw)` now"),
+                             [TextNode("call ", TextType.TEXT),
+                              TextNode("my_func(**kw)", TextType.CODE),
+                              TextNode(" now", TextType.TEXT)])
+
+    def test_brackets_without_url_stay_text(self):
+        self.assertListEqual(text_to_textnodes("a [note] and [link](/x)"),
+                             [TextNode("a [note] and ", TextType.TEXT),
+                              TextNode("link", TextType.LINK, "/x")])
+
+    def test_unclosed_delimiter(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("Text with **one delimiter")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import time
+import unittest
+
+import block
+from generator import find_pages, generate_pages
+from profiler import BuildProfiler, format_summary
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_nested_phases_record_self_time(self):
+        profiler = BuildProfiler()
+        profiler.start_page("page.md")
+        with profiler.phase("outer"):
+            with profiler.phase("inner"):
+                time.sleep(0.02)
+        profiler.end_page()
+        phases = profiler.pages["page.md"]
+        self.assertGreaterEqual(phases["inner"][0], 0.02)
+        self.assertLess(phases["outer"][0], 0.02)
+
+    def test_instrument_restores_functions(self):
+        original = block.block_to_block_type
+        with BuildProfiler().instrument():
+            self.assertIsNot(block.block_to_block_type, original)
+        self.assertIs(block.block_to_block_type, original)
+
+    def test_profiled_build(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            os.makedirs(content)
+            for name, body in (("short.md", "# Short"), ("long.md", "# Long\n\n" + "words **bold** " * 2000)):
+                with open(os.path.join(content, name), "w") as f:
+                    f.write(body)
+            template = os.path.join(root, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+
+            profiler = BuildProfiler()
+            generate_pages(find_pages(content, os.path.join(root, "docs")), template, "/", profiler=profiler)
+            report = profiler.save(os.path.join(root, "profile.json"), top=1)
+
+        self.assertEqual(set(report["phases"]),
+                         {"read", "markdown_to_blocks", "block_to_block_type", "text_to_textnodes",
+                          "block_to_html_node", "to_html", "template", "write", "total"})
+        self.assertEqual([entry["page"] for entry in report["slowest"]], [os.path.join(content, "long.md")])
+        self.assertIn("slowest 1 pages:", format_summary(report))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from block import BlockType
+from generator import render_blocks
+from render_cache import RenderCache
+from text_processing import collect_links
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = RenderCache()
+        key = cache.key("Some text", BlockType.PARAGRAPH, "/")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "<p>Some text</p>")
+        self.assertEqual(cache.get(key), "<p>Some text</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_depends_on_type_and_basepath(self):
+        cache = RenderCache()
+        keys = {cache.key("- x", BlockType.PARAGRAPH, "/"),
+                cache.key("- x", BlockType.UN_O_LIST, "/"),
+                cache.key("- x", BlockType.PARAGRAPH, "/site/")}
+        self.assertEqual(len(keys), 3)
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(max_bytes=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 8)
+
+    def test_survives_across_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            RenderCache(directory).put("abcd", "<p>x</p>")
+            cache = RenderCache(directory)
+            self.assertEqual(cache.get("abcd"), "<p>x</p>")
+            self.assertEqual(cache.hits, 1)
+
+    def test_prune_to_disk_limit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = RenderCache(directory, max_disk_bytes=10)
+            for key in ("aa01", "aa02", "bb03"):
+                cache.put(key, "12345")
+            self.assertEqual(cache.prune(), 1)
+            remaining = sum(len(files) for _, _, files in os.walk(directory))
+            self.assertEqual(remaining, 2)
+
+    def test_cached_blocks_render_the_same(self):
+        blocks = [(BlockType.PARAGRAPH, "A [link](/x) and **bold**"), (BlockType.CODE, "```\ncode\n```")]
+        expected = "".join(node.to_html() for node in render_blocks(blocks, "/site/"))
+        cache = RenderCache()
+        for _ in range(2):
+            self.assertEqual("".join(node.to_html() for node in render_blocks(blocks, "/site/", cache)), expected)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_cached_blocks_still_report_links(self):
+        blocks = [(BlockType.PARAGRAPH, "A [link](/x) and ![img](/y.png)"), (BlockType.PARAGRAPH, "none")]
+        cache = RenderCache()
+        for _ in range(2):
+            with collect_links() as links:
+                list(render_blocks(blocks, "/site/", cache))
+            self.assertEqual(links, ["/x", "/y.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
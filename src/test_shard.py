@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from fixtures import write_file
+from generator import find_pages
+from shard import build_shard, load_shards, merge_shards, parse_shard, select_shard, shard_dir, shard_of
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestPartition(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ["0/4", "5/4", "1/0", "1-4", "a/b"]:
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_shards_cover_every_page_once(self):
+        pages = [(os.path.join("content", f"page{i}.md"), f"page{i}.html") for i in range(50)]
+        shards = [select_shard(pages, "content", index, 4) for index in range(1, 5)]
+        self.assertEqual(sorted(page for shard in shards for page in shard), sorted(pages))
+        self.assertTrue(all(shards))
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of("blog/post/index.md", 7), shard_of("blog/post/index.md", 7))
+        self.assertEqual(shard_of("blog/post/index.md", 1), 1)
+        self.assertEqual(shard_of(os.path.join("blog", "post.md"), 1000), shard_of("blog/post.md", 1000))
+
+
+class TestShardedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write_file(os.path.join(self.root, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.root, "static/index.css"), "body {}")
+        write_file(os.path.join(self.root, "content/index.md"), "# Home\n\n[first](/blog/page0) and ![logo](/logo.png)")
+        for i in range(12):
+            write_file(os.path.join(self.root, f"content/blog/page{i}/index.md"),
+                       f"---\ndate: 2024-01-{i + 1:02d}\n---\n# Page {i}\n\n[home](/)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_main(self, *args, cwd=None):
+        return subprocess.run([sys.executable, MAIN, *args], cwd=cwd or self.root, check=True,
+                              capture_output=True, text=True)
+
+    def read_tree(self, directory):
+        tree = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                with open(os.path.join(root, name), "rb") as f:
+                    tree[os.path.relpath(os.path.join(root, name), directory)] = f.read()
+        return tree
+
+    def test_merged_shards_match_single_build(self):
+        shard_root = os.path.join(self.root, "shards")
+        processes = [subprocess.Popen([sys.executable, MAIN, "-q", "--shard", f"{i}/3", "--shard-root", shard_root,
+                                       "/site/"], cwd=self.root) for i in range(1, 4)]
+        self.assertEqual([process.wait() for process in processes], [0, 0, 0])
+        result = self.run_main("merge", "--shard-root", shard_root, "--site-url", "https://example.com")
+        self.assertIn("13 pages merged from 3 shards", result.stderr)
+        self.assertIn("broken link in content/index.md: /logo.png", result.stderr)
+        merged = self.read_tree(os.path.join(self.root, "docs"))
+
+        single = os.path.join(self.root, "single")
+        os.makedirs(single)
+        for name in ["content", "static", "template.html"]:
+            os.symlink(os.path.join(self.root, name), os.path.join(single, name))
+        self.run_main("-q", "--site-url", "https://example.com", "/site/", cwd=single)
+        self.assertEqual(merged, self.read_tree(os.path.join(single, "docs")))
+        self.assertIn(os.path.join("blog", "feed.xml"), merged)
+
+    def test_rerun_drops_pages_that_left_the_shard(self):
+        content = os.path.join(self.root, "content")
+        shard_root = os.path.join(self.root, "shards")
+        template = os.path.join(self.root, "template.html")
+        pages = find_pages(content, shard_dir(shard_root, 1, 1))
+        build_shard(content, template, shard_root, "/", 1, 1)
+        os.remove(pages[0][0])
+        self.assertEqual(build_shard(content, template, shard_root, "/", 1, 1)["pages"], len(pages) - 1)
+        self.assertFalse(os.path.exists(pages[0][1]))
+
+    def test_build_removes_shards_of_another_count(self):
+        content = os.path.join(self.root, "content")
+        shard_root = os.path.join(self.root, "shards")
+        template = os.path.join(self.root, "template.html")
+        for i in range(1, 5):
+            build_shard(content, template, shard_root, "/", i, 4)
+        for i in range(1, 4):
+            build_shard(content, template, shard_root, "/", i, 3)
+        self.assertEqual(sorted(os.listdir(shard_root)), ["1-of-3", "2-of-3", "3-of-3"])
+        self.assertEqual(len(merge_shards(shard_root, os.path.join(self.root, "docs"))["pages"]), 13)
+
+    def test_merge_rejects_collisions_and_missing_shards(self):
+        content = os.path.join(self.root, "content")
+        shard_root = os.path.join(self.root, "shards")
+        template = os.path.join(self.root, "template.html")
+        dest = os.path.join(self.root, "docs")
+        build_shard(content, template, shard_root, "/", 1, 2)
+        with self.assertRaises(Exception) as ctx:
+            load_shards(shard_root)
+        self.assertIn("missing shards 2 of 2", str(ctx.exception))
+
+        build_shard(content, template, shard_root, "/", 2, 2)
+        with self.assertRaises(Exception) as ctx:
+            merge_shards(shard_root, dest, assets=["index.html"])
+        self.assertIn("index.html: static asset and " + os.path.join(content, "index.md"), str(ctx.exception))
+        self.assertFalse(os.path.exists(dest))
+        self.assertEqual(len(merge_shards(shard_root, dest)["pages"]), 13)
+
+        build_shard(content, template, shard_root, "/other/", 2, 2)
+        with self.assertRaises(Exception) as ctx:
+            load_shards(shard_root)
+        self.assertIn("different basepath", str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
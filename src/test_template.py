@@ -0,0 +1,112 @@
+import io
+import os
+import tempfile
+import unittest
+
+from fixtures import write_file
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_file
+from template import Template, TemplateLoader, rewrite_urls
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(template.render("Hi", "<p>body</p>"),
+                         "<title>Hi</title><article><p>body</p></article>")
+
+    def test_title_is_escaped(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        node = ParentNode("div", [LeafNode("p", "body")])
+        out = io.StringIO()
+        template.write(out, "a < b & c", node)
+        self.assertEqual(out.getvalue(), "<title>a &lt; b &amp; c</title><div><p>body</p></div>")
+        self.assertEqual(template.render("a < b & c", "<p>body</p>"), "<title>a &lt; b &amp; c</title><p>body</p>")
+
+    def test_slots_are_split_once(self):
+        template = Template("a{{ Title }}b{{ Content }}c")
+        self.assertEqual(template.segments, ["a", "Title", "b", "Content", "c"])
+
+    def test_basepath_applied_to_template(self):
+        template = Template('<link href="/index.css" /><img src="/logo.png" />{{ Content }}', "/site/")
+        self.assertEqual(template.render("", "x"),
+                         '<link href="/site/index.css" /><img src="/site/logo.png" />x')
+
+    def test_content_is_not_rewritten_by_render(self):
+        template = Template("{{ Content }}", "/site/")
+        self.assertEqual(template.render("", '<a href="/x">x</a>'), '<a href="/x">x</a>')
+
+    def test_write_streams_node(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        node = ParentNode("div", [LeafNode("p", "body")])
+        out = io.StringIO()
+        template.write(out, "Hi", node)
+        self.assertEqual(out.getvalue(), template.render("Hi", node.to_html()))
+
+
+class TestRewriteUrls(unittest.TestCase):
+    def test_rewrites_site_relative_urls(self):
+        node = ParentNode("div", [
+            LeafNode("a", "home", {"href": "/"}),
+            ParentNode("p", [LeafNode("img", "", {"src": "/images/tom.png", "alt": "tom"})]),
+            LeafNode("a", "out", {"href": "https://boot.dev"}),
+        ])
+        rewrite_urls(node, "/static_site/")
+        self.assertEqual(node.to_html(),
+                         '<div><a href="/static_site/">home</a>'
+                         '<p><img src="/static_site/images/tom.png" alt="tom"></img></p>'
+                         '<a href="https://boot.dev">out</a></div>')
+
+
+class TestTemplateLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.templates = os.path.join(self.root, "templates")
+        self.content = os.path.join(self.root, "content")
+        self.default = os.path.join(self.root, "template.html")
+        write_file(self.default, "{{ include nav.html }}{{ Content }}")
+        write_file(os.path.join(self.templates, "nav.html"), "<nav>{{ Title }}</nav>")
+        self.loader = TemplateLoader(self.default, "/", self.templates, self.content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_include_expands_partial_and_records_it(self):
+        template = self.loader.load(self.default)
+        self.assertEqual(template.render("Hi", "body"), "<nav>Hi</nav>body")
+        self.assertEqual(set(template.dependencies), {self.default, os.path.join(self.templates, "nav.html")})
+
+    def test_include_cycle_raises(self):
+        write_file(os.path.join(self.templates, "nav.html"), "{{ include nav.html }}")
+        with self.assertRaises(Exception):
+            self.loader.load(self.default)
+
+    def test_directory_template_wins_over_default(self):
+        write_file(os.path.join(self.templates, "blog.html"), "<b>{{ Title }}</b>")
+        template, dependencies = self.loader.for_page(os.path.join(self.content, "blog", "post", "index.md"))
+        self.assertEqual(template.render("Hi", ""), "<b>Hi</b>")
+        self.assertEqual(dependencies, {
+            os.path.join(self.templates, "blog", "post.html"): None,
+            os.path.join(self.templates, "blog.html"): hash_file(os.path.join(self.templates, "blog.html")),
+        })
+
+        template, dependencies = self.loader.for_page(os.path.join(self.content, "index.md"))
+        self.assertEqual(template.render("Hi", ""), "<nav>Hi</nav>")
+
+    def test_front_matter_template_wins(self):
+        write_file(os.path.join(self.templates, "blog.html"), "<b>{{ Title }}</b>")
+        write_file(os.path.join(self.templates, "bare.html"), "{{ Content }}")
+        template, _ = self.loader.for_page(os.path.join(self.content, "blog", "index.md"), {"template": "bare.html"})
+        self.assertEqual(template.render("Hi", "body"), "body")
+
+    def test_refresh_drops_templates_with_changed_partials(self):
+        self.loader.load(self.default)
+        self.assertEqual(self.loader.refresh(), 0)
+        write_file(os.path.join(self.templates, "nav.html"), "<nav>changed</nav>")
+        self.assertEqual(self.loader.refresh(), 1)
+        self.assertEqual(self.loader.load(self.default).render("Hi", ""), "<nav>changed</nav>")
+
+
+if __name__ == "__main__":
+    unittest.main()
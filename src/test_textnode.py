@@ -19,6 +19,11 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.ITALIC)
         self.assertNotEqual(node, node2)
 
+    def test_slots(self):
+        node = TextNode("This is a text node", TextType.LINK, "https://boot.dev")
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertEqual(node.url, "https://boot.dev")
+
     
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
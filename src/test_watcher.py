@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+
+from fixtures import write_file
+from generator import find_pages, template_loader
+from listing import build_metadata_index, generate_listings
+from manifest import load_manifest
+from output import OutputWriter
+from watcher import InotifyWatcher, PollingWatcher, apply_changes
+
+
+class WatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template_path = os.path.join(self.root, "template.html")
+        write_file(self.template_path, "{{ Title }}|{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestWatchers(WatchTestCase):
+    def check_watcher(self, watcher):
+        try:
+            page = os.path.join(self.content, "blog", "index.md")
+            write_file(page, "# Changed")
+            self.assertIn(page, watcher.wait(timeout=2))
+
+            new_page = os.path.join(self.content, "new", "index.md")
+            write_file(new_page, "# New")
+            self.assertIn(new_page, watcher.wait(timeout=2))
+
+            os.remove(os.path.join(self.static, "index.css"))
+            self.assertIn(os.path.join(self.static, "index.css"), watcher.wait(timeout=2))
+
+            write_file(self.template_path, "{{ Content }}")
+            self.assertIn(self.template_path, watcher.wait(timeout=2))
+        finally:
+            watcher.close()
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([self.content, self.static, self.template_path], interval=0.01))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.content, self.static, self.template_path])
+        except (OSError, AttributeError, TypeError):
+            self.skipTest("inotify is not available")
+        self.check_watcher(watcher)
+
+
+class TestApplyChanges(WatchTestCase):
+    def apply(self, *paths):
+        return apply_changes(set(paths), self.content, self.static, self.template_path, self.dest, "/",
+                             template_loader(self.template_path, "/", self.content))
+
+    def test_regenerates_only_changed_page(self):
+        page = os.path.join(self.content, "blog", "index.md")
+        self.assertFalse(self.apply(page))
+        with open(os.path.join(self.dest, "blog", "index.html")) as f:
+            self.assertEqual(f.read(), "Blog|<div><h1>Blog</h1></div>")
+
+        os.remove(page)
+        self.assertFalse(self.apply(page))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_listed_page_needs_build(self):
+        page = os.path.join(self.content, "notes", "first.md")
+        write_file(page, "# First")
+        self.assertTrue(self.apply(page))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "notes", "first.html")))
+
+    def test_listed_page_refreshes_its_listing_only(self):
+        index_path = os.path.join(self.root, ".cache", "metadata.json")
+        state_path = os.path.join(self.root, ".cache", "listings.json")
+        templates = template_loader(self.template_path, "/", self.content)
+        for name in ["notes/first.md", "notes/second.md", "posts/one.md"]:
+            write_file(os.path.join(self.content, name), f"# {name}")
+        index = build_metadata_index(find_pages(self.content, self.dest), self.dest, index_path)
+        generate_listings(self.content, self.dest, "/", index, templates, OutputWriter(), state_path)
+        posts = os.path.join(self.dest, "posts", "index.html")
+        os.utime(posts, ns=(0, 0))
+
+        page = os.path.join(self.content, "notes", "first.md")
+        write_file(page, "# Renamed")
+        self.assertFalse(apply_changes({page}, self.content, self.static, self.template_path, self.dest, "/",
+                                       templates, index_path, state_path))
+        with open(os.path.join(self.dest, "notes", "index.html")) as f:
+            self.assertIn(">Renamed</a>", f.read())
+        self.assertEqual(os.stat(posts).st_mtime_ns, 0)
+        self.assertEqual(sorted(load_manifest(state_path)),
+                         [os.path.join(self.dest, "notes", "index.html"), posts])
+
+    def test_session_keeps_the_index_in_memory(self):
+        index_path = os.path.join(self.root, ".cache", "metadata.json")
+        templates = template_loader(self.template_path, "/", self.content)
+        page = os.path.join(self.content, "notes", "first.md")
+        write_file(page, "# First")
+        index = build_metadata_index(find_pages(self.content, self.dest), self.dest, index_path)
+        generate_listings(self.content, self.dest, "/", index, templates, OutputWriter())
+        with open(index_path) as f:
+            saved = f.read()
+
+        session = {}
+        for title in ["Second", "Third"]:
+            write_file(page, f"# {title}")
+            self.assertFalse(apply_changes({page}, self.content, self.static, self.template_path, self.dest, "/",
+                                           templates, index_path, session=session))
+        with open(os.path.join(self.dest, "notes", "index.html")) as f:
+            self.assertIn(">Third</a>", f.read())
+        self.assertEqual(session["metadata_index"][page]["metadata"]["title"], "Third")
+        with open(index_path) as f:
+            self.assertEqual(f.read(), saved)
+
+    def test_copies_changed_asset(self):
+        css = os.path.join(self.static, "index.css")
+        self.assertFalse(self.apply(css))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_template_change_needs_full_build(self):
+        self.assertTrue(self.apply(self.template_path))
+        self.assertTrue(self.apply(os.path.join(self.root, "templates", "nav.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
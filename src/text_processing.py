@@ -1,30 +1,83 @@
 import re
+from contextlib import contextmanager
 
+from htmlnode import CodeNode, PlainLeafNode
 from textnode import TextType, TextNode, LeafNode
 
-def text_node_to_html_node(text_node):
-    if text_node.text_type not in TextType:
-        raise TypeError
-    if text_node.text_type == TextType.TEXT:
-        return LeafNode(tag=None, value=text_node.text)
-    
-    elif text_node.text_type == TextType.BOLD:
-        return LeafNode("b", text_node.text)
-    
-    elif text_node.text_type == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
-    
-    elif text_node.text_type == TextType.CODE:
-        return LeafNode("code", text_node.text)
-    
-    elif text_node.text_type == TextType.LINK:
+# urls of the links and images rendered inside collect_links()
+_collected_links = None
+
+
+@contextmanager
+def collect_links():
+    global _collected_links
+    outer = _collected_links
+    _collected_links = links = []
+    try:
+        yield links
+    finally:
+        _collected_links = outer
+        if outer is not None:
+            outer.extend(links)
+
+
+def record_links(urls):
+    if _collected_links is not None:
+        _collected_links.extend(urls)
+
+
+def _renderers(leaf, code_leaf):
+    # built once per leaf class, rather than passing the class on every call
+    def text_to_html(text_node):
+        return leaf(None, text_node.text)
+
+    def bold_to_html(text_node):
+        return leaf("b", text_node.text)
+
+    def italic_to_html(text_node):
+        return leaf("i", text_node.text)
+
+    def code_to_html(text_node):
+        return code_leaf("code", text_node.text)
+
+    def link_to_html(text_node):
+        if _collected_links is not None:
+            _collected_links.append(text_node.url)
         prop = {"href": text_node.url}
-        return LeafNode("a", text_node.text, prop)
-    
-    elif text_node.text_type == TextType.IMAGE:
+        return leaf("a", text_node.text, prop)
+
+    def image_to_html(text_node):
+        if _collected_links is not None:
+            _collected_links.append(text_node.url)
         prop = {"src": text_node.url, "alt": text_node.text}
-        return LeafNode("img", '', prop)
-    
+        return leaf("img", '', prop)
+
+    return {
+        TextType.TEXT: text_to_html,
+        TextType.BOLD: bold_to_html,
+        TextType.ITALIC: italic_to_html,
+        TextType.CODE: code_to_html,
+        TextType.LINK: link_to_html,
+        TextType.IMAGE: image_to_html,
+    }
+
+
+INLINE_RENDERERS = _renderers(LeafNode, CodeNode)
+# the same renderers for text holding no "<" or "&", their leaves skip the escaping check
+PLAIN_RENDERERS = _renderers(PlainLeafNode, PlainLeafNode)
+
+
+def register_inline_renderer(text_type, renderer):
+    INLINE_RENDERERS[text_type] = renderer
+    PLAIN_RENDERERS[text_type] = renderer
+
+
+def text_node_to_html_node(text_node, renderers=INLINE_RENDERERS):
+    renderer = renderers.get(text_node.text_type)
+    if renderer is None:
+        raise TypeError
+    return renderer(text_node)
+
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
@@ -45,91 +98,139 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
     return new_nodes
 
+BRACKET_PATTERN = re.compile(r"[\[\]()]")
+
+
+def match_brackets(text):
+    # one pass pairs every balanced [] and (), so nested labels and URLs
+    # like /wiki/Foo_(bar) resolve without rescanning the text
+    opens = []
+    brackets = {}
+    parens = {}
+    open_brackets = []
+    open_parens = []
+    for match in BRACKET_PATTERN.finditer(text):
+        char = match.group()
+        pos = match.start()
+        if char == "[":
+            opens.append(pos)
+            open_brackets.append(pos)
+        elif char == "(":
+            open_parens.append(pos)
+        elif char == "]":
+            if open_brackets:
+                brackets[open_brackets.pop()] = pos
+        elif open_parens:
+            parens[open_parens.pop()] = pos
+    return opens, brackets, parens
+
+
+def _match_link(text, open_bracket, brackets, parens):
+    close_bracket = brackets.get(open_bracket)
+    if close_bracket is None:
+        return None
+    close_paren = parens.get(close_bracket + 1)
+    if close_paren is None:
+        return None
+    return text[open_bracket + 1:close_bracket], text[close_bracket + 2:close_paren], close_paren + 1
+
+
+def iter_markdown_links(text):
+    opens, brackets, parens = match_brackets(text)
+    end = 0
+    for open_bracket in opens:
+        if open_bracket < end:
+            continue
+        link = _match_link(text, open_bracket, brackets, parens)
+        if link is None:
+            continue
+        label, url, end = link
+        is_image = open_bracket > 0 and text[open_bracket - 1] == "!"
+        yield (open_bracket - 1 if is_image else open_bracket), end, label, url, is_image
+
+
 def extract_markdown_images(text):
-    images = []
-    match_alt_text = re.findall(r"!\[.*?\]", text)
-    match_url = re.findall(r"\(.*?\)", text)
-    for i in range(len(match_alt_text)):
-        images.append((match_alt_text[i].strip("![").rstrip("]"), match_url[i].strip("(").rstrip(")")))
-    return images
+    return [(label, url) for _, _, label, url, is_image in iter_markdown_links(text) if is_image]
 
 
 def extract_markdown_links(text):
-    links = []
-    match_anchor_text = re.findall(r"\[.*?\]", text)
-    match_url = re.findall(r"\(.*?\)", text)
-    for i in range(len(match_anchor_text)):
-        links.append((match_anchor_text[i].strip("[").rstrip("]"), match_url[i].strip("(").rstrip(")")))
-    return links
+    return [(label, url) for _, _, label, url, is_image in iter_markdown_links(text) if not is_image]
 
 
-def split_nodes_image(old_nodes):
+def _split_nodes_links(old_nodes, images):
     new_nodes = []
+    text_type = TextType.IMAGE if images else TextType.LINK
     for node in old_nodes:
         if node.text_type is not TextType.TEXT:
             new_nodes.append(node)
+            continue
 
-        elif node.text_type is TextType.TEXT:
-            matches = extract_markdown_images(node.text)
-            if not matches:
-                new_nodes.append(node)
+        text = node.text
+        plain_start = 0
+        for start, end, label, url, is_image in iter_markdown_links(text):
+            if is_image is not images:
                 continue
-            
-            current_text = node.text
-            for image_alt, image_link in matches:
-                node_parts = current_text.split(f"![{image_alt}]({image_link})", 1)
+            if start > plain_start:
+                new_nodes.append(TextNode(text[plain_start:start], TextType.TEXT))
+            new_nodes.append(TextNode(label, text_type, url))
+            plain_start = end
 
-                if len(node_parts) != 2:
-                    raise Exception("that's invalid Markdown syntax")
-                
-                if node_parts[0] != "":
-                    new_nodes.append(TextNode(node_parts[0], TextType.TEXT))
-                new_nodes.append(TextNode(image_alt, TextType.IMAGE, image_link))
+        if plain_start == 0:
+            new_nodes.append(node)
+        elif plain_start < len(text):
+            new_nodes.append(TextNode(text[plain_start:], TextType.TEXT))
+    return new_nodes
 
-                current_text = node_parts[1]
 
-            if current_text != "":
-                new_nodes.append(TextNode(current_text, TextType.TEXT))
-    return new_nodes
+def split_nodes_image(old_nodes):
+    return _split_nodes_links(old_nodes, images=True)
 
-def split_nodes_link(old_nodes):
-    new_nodes = []
-    for node in old_nodes:
-        if node.text_type is not TextType.TEXT:
-            new_nodes.append(node)
 
-        elif node.text_type is TextType.TEXT:
-            matches = extract_markdown_links(node.text)
-            if not matches:
-                new_nodes.append(node)
-                continue
-            
-            current_text = node.text
-            for anchor_text, url in matches:
-                node_parts = current_text.split(f"[{anchor_text}]({url})", 1)
+def split_nodes_link(old_nodes):
+    return _split_nodes_links(old_nodes, images=False)
 
-                if len(node_parts) != 2:
-                    raise Exception("that's invalid Markdown syntax")
-                
-                if node_parts[0] != "":
-                    new_nodes.append(TextNode(node_parts[0], TextType.TEXT))
-                new_nodes.append(TextNode(anchor_text, TextType.LINK, url))
 
-                current_text = node_parts[1]
+INLINE_PATTERN = re.compile(r"!\[|\[|\*\*|_|`")
+DELIMITER_TYPES = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
 
-            if current_text != "":
-                new_nodes.append(TextNode(current_text, TextType.TEXT))
-    return new_nodes
 
 def text_to_textnodes(text):
-    node = TextNode(text, TextType.TEXT)
-    node = split_nodes_image([node])
-    node = split_nodes_link(node)
-
-    delimiters = ["**",  "_", "`"]
-    text_type = [TextType.BOLD, TextType.ITALIC, TextType.CODE]
+    nodes = []
+    pos = 0
+    plain_start = 0
+    brackets = parens = None
+    search = INLINE_PATTERN.search
+    while True:
+        match = search(text, pos)
+        if match is None:
+            break
+        token = match.group()
+        start = match.start()
+
+        if token[-1] == "[":
+            if brackets is None:
+                _, brackets, parens = match_brackets(text)
+            link = _match_link(text, match.end() - 1, brackets, parens)
+            if link is None:
+                pos = match.end()
+                continue
+            label, url, end = link
+            if start > plain_start:
+                nodes.append(TextNode(text[plain_start:start], TextType.TEXT))
+            nodes.append(TextNode(label, TextType.IMAGE if token == "![" else TextType.LINK, url))
+
+        else:
+            close = text.find(token, match.end())
+            if close == -1:
+                raise Exception("that's invalid Markdown syntax")
+            if start > plain_start:
+                nodes.append(TextNode(text[plain_start:start], TextType.TEXT))
+            if close > match.end():
+                nodes.append(TextNode(text[match.end():close], DELIMITER_TYPES[token]))
+            end = close + len(token)
 
-    for i in range(len(delimiters)):
-        node = split_nodes_delimiter(node, delimiters[i], text_type[i])
-    return node
+        pos = plain_start = end
 
+    if plain_start < len(text):
+        nodes.append(TextNode(text[plain_start:], TextType.TEXT))
+    return nodes
@@ -0,0 +1,213 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from assets import copy_file
+from generator import generate_page
+from listing import listing_dir, refresh_listings
+from output import OutputWriter, remove_output
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _walk_files(path):
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, _, files in os.walk(path):
+        for name in files:
+            yield os.path.join(root, name)
+
+
+class PollingWatcher():
+    def __init__(self, roots, interval=0.1):
+        self.roots = [os.path.normpath(root) for root in roots]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root in self.roots:
+            for path in _walk_files(root):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher():
+    def __init__(self, roots, debounce=0.01):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.debounce = debounce
+        self.directories = {}
+        self.files = set()
+        self.filtered = set()
+        roots = [os.path.normpath(root) for root in roots]
+        for root in roots:
+            if os.path.isdir(root):
+                self._watch_tree(root)
+        for root in roots:
+            if not os.path.isdir(root):
+                self.files.add(root)
+                directory = os.path.dirname(root) or "."
+                if directory not in self.directories.values():
+                    self.filtered.add(self._watch(directory))
+
+    def _watch(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.directories[wd] = directory
+        return wd
+
+    def _watch_tree(self, directory):
+        found = []
+        for root, _, files in os.walk(directory):
+            self._watch(root)
+            found.extend(os.path.join(root, name) for name in files)
+        return found
+
+    def _read_events(self):
+        changed = set()
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            directory = self.directories.get(wd)
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+            if directory is None or not name:
+                continue
+            path = os.path.normpath(os.path.join(directory, os.fsdecode(name)))
+            if wd in self.filtered:
+                if path in self.files:
+                    changed.add(path)
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                changed.update(self._watch_tree(path))
+            else:
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = self._read_events()
+        while select.select([self.fd], [], [], self.debounce)[0]:
+            changed |= self._read_events()
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(roots):
+    try:
+        return InotifyWatcher(roots)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(roots)
+
+
+def apply_changes(changed, content_dir, static_dir, template_path, dest_dir, basepath, templates, index_path=None,
+                  state_path=None, site_url="", session=None):
+    content_dir = os.path.normpath(content_dir)
+    static_dir = os.path.normpath(static_dir)
+    templates_dir = os.path.normpath(templates.templates_dir)
+    needs_full_build = False
+    listed = []
+    for path in sorted(changed):
+        path = os.path.normpath(path)
+        if path == os.path.normpath(template_path) or path.startswith(templates_dir + os.sep):
+            # the incremental build knows which pages use which template
+            needs_full_build = True
+
+        elif path.startswith(content_dir + os.sep):
+            rel_path = os.path.relpath(path, content_dir)
+            if not rel_path.endswith(".md"):
+                # a vanished directory takes its pages with it
+                needs_full_build = needs_full_build or not os.path.exists(path)
+                continue
+            directory, name = os.path.split(rel_path)
+            dest_path = os.path.join(dest_dir, directory, name.replace(".md", ".html"))
+            if listing_dir(path, content_dir) is not None:
+                listed.append((path, dest_path))
+            if not os.path.exists(path):
+                remove_output(dest_path, dest_dir)
+                continue
+            try:
+                generate_page(path, template_path, dest_path, basepath, templates)
+            except Exception as e:
+                logger.error("failed to generate %s: %s", path, e)
+
+        elif path.startswith(static_dir + os.sep):
+            dest_path = os.path.join(dest_dir, os.path.relpath(path, static_dir))
+            if os.path.isfile(path):
+                copy_file(path, dest_path, os.stat(path))
+            elif os.path.isdir(dest_path):
+                needs_full_build = True
+            else:
+                remove_output(dest_path, dest_dir)
+
+    if listed and not needs_full_build:
+        # the listings of the edited pages are rebuilt from the last build's metadata index; without one it
+        # takes a build
+        refreshed = None
+        if index_path is not None:
+            refreshed = refresh_listings(listed, content_dir, dest_dir, basepath, templates, OutputWriter(),
+                                         index_path, state_path, site_url, session)
+        needs_full_build = refreshed is None
+    return needs_full_build
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, port):
+    handler = partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server